@@ -2,12 +2,18 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
 import logging
+import threading
 
 from modules.chat import chat_bp
 from modules.audio import audio_bp
 from modules.vision import vision_bp
 from modules.auth import auth_bp
 from modules.system import system_bp
+from modules.model_registry import model_registry, ModelLoadError
+from modules.speech_synthesis import speech_synthesizer
+from utils.executors import PoolSaturated
+from utils.capabilities import capabilities
+from config import ASR_WARMUP, TTS_PREWARM, DEBUG
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,6 +21,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def warm_up_asr():
+    try:
+        model_registry.get("asr").warm_up()
+    except ModelLoadError:
+        pass
+
+def start_background_tasks():
+    """
+    Start this process's background threads. Threads do not survive fork(),
+    so under gunicorn each worker calls this from the post_fork hook.
+    """
+    capabilities.start()
+    model_registry.start()
+
+def start_warmup():
+    """
+    Warm state every process shares: the ASR model and the on-disk TTS clip
+    cache. Run once per deployment, not per process; gunicorn.conf.py loads
+    the ASR weights in the master instead and prewarms TTS in one worker.
+    """
+    if ASR_WARMUP:
+        threading.Thread(target=warm_up_asr, name="asr-warmup", daemon=True).start()
+    if TTS_PREWARM:
+        start_tts_prewarm()
+
+def start_tts_prewarm():
+    threading.Thread(target=speech_synthesizer.prewarm, name="tts-prewarm", daemon=True).start()
+
 app = Flask(__name__)
 CORS(app)
 
@@ -36,11 +70,18 @@ def index():
 def not_found(e):
     return jsonify({"error": "Endpoint not found"}), 404
 
+@app.errorhandler(PoolSaturated)
+def pool_saturated(e):
+    return jsonify({"error": "Server is busy, please retry shortly"}), 429, {"Retry-After": str(e.retry_after)}
+
 @app.errorhandler(500)
 def server_error(e):
     logger.error(f"Server error: {str(e)}")
     return jsonify({"error": "Internal server error"}), 500
 
 if __name__ == '__main__':
+    # Development server; use `gunicorn -c gunicorn.conf.py` in production
+    start_background_tasks()
+    start_warmup()
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    app.run(host='0.0.0.0', port=port, debug=DEBUG)
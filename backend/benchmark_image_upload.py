@@ -0,0 +1,70 @@
+import io
+import json
+import time
+import base64
+import argparse
+import numpy as np
+import cv2
+from flask import Flask, request, jsonify
+from utils.helpers import read_request_image
+
+RESOLUTIONS = {
+    "640x480": (480, 640),
+    "1280x720": (720, 1280)
+}
+
+def make_frame(height, width):
+    # Smooth gradients plus noise compress like a webcam frame rather than pure noise
+    y, x = np.mgrid[0:height, 0:width]
+    frame = np.stack([(x * 255 // width), (y * 255 // height), ((x + y) * 255 // (width + height))], axis=-1)
+    noise = np.random.randint(0, 32, size=frame.shape)
+    return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+def create_app():
+    app = Flask(__name__)
+
+    @app.route('/decode', methods=['POST'])
+    def decode():
+        image, _ = read_request_image(request)
+        return jsonify({"shape": list(image.shape)})
+
+    return app
+
+def time_request(send, iterations, warmup):
+    for _ in range(warmup):
+        send()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        response = send()
+        timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    return np.median(timings), np.percentile(timings, 95)
+
+def benchmark():
+    parser = argparse.ArgumentParser(description='Compare base64 JSON and binary image upload decoding')
+    parser.add_argument('--iterations', type=int, default=100, help='Timed requests per encoding')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed requests per encoding')
+    parser.add_argument('--quality', type=int, default=85, help='JPEG quality of the test frames')
+    args = parser.parse_args()
+    client = create_app().test_client()
+    print(f"{'resolution':<12}{'encoding':<12}{'bytes':>10}{'median ms':>12}{'p95 ms':>12}")
+    for label, (height, width) in RESOLUTIONS.items():
+        _, encoded = cv2.imencode('.jpg', make_frame(height, width), [cv2.IMWRITE_JPEG_QUALITY, args.quality])
+        jpeg = encoded.tobytes()
+        body = json.dumps({"image": "data:image/jpeg;base64," + base64.b64encode(jpeg).decode('utf-8')})
+        encodings = {
+            "base64": (len(body), lambda: client.post('/decode', data=body, content_type='application/json')),
+            "raw": (len(jpeg), lambda: client.post('/decode', data=jpeg, content_type='image/jpeg')),
+            "multipart": (len(jpeg), lambda: client.post(
+                '/decode',
+                data={"image": (io.BytesIO(jpeg), "frame.jpg", "image/jpeg")},
+                content_type='multipart/form-data'
+            ))
+        }
+        for name, (size, send) in encodings.items():
+            median, p95 = time_request(send, args.iterations, args.warmup)
+            print(f"{label:<12}{name:<12}{size:>10}{median:>12.2f}{p95:>12.2f}")
+
+if __name__ == "__main__":
+    benchmark()
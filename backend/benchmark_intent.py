@@ -0,0 +1,100 @@
+import re
+import time
+import random
+import string
+import argparse
+import torch
+from modules.intent_classifier import INTENT_RULES, MAX_SEQUENCE_LENGTH, IntentRuleMatcher, IntentTokenizer
+
+WORDS = [
+    "what", "is", "the", "weather", "like", "tomorrow", "set", "an", "alarm", "for", "seven",
+    "play", "some", "music", "turn", "off", "lights", "remind", "me", "to", "call", "mom",
+    "read", "news", "tell", "joke", "schedule", "meeting", "send", "email", "search", "for",
+    "directions", "home", "text", "john", "how", "are", "you", "today", "who", "wrote", "hamlet",
+    "explain", "quantum", "physics", "please", "thanks", "could", "would", "tonight"
+]
+
+def make_utterances(count, seed):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(2, 12))) for _ in range(count)]
+
+def legacy_classify(text):
+    text = text.lower()
+    for pattern, intent in INTENT_RULES.items():
+        if re.search(pattern, text):
+            return intent
+    return "general_question"
+
+def legacy_preprocess(text, vocab):
+    text = text.lower()
+    text = text.translate(str.maketrans('', '', string.punctuation))
+    tokens = text.split()
+    indices = []
+    for token in tokens:
+        if token in vocab:
+            indices.append(vocab[token])
+        else:
+            indices.append(vocab["<UNK>"])
+    if len(indices) < MAX_SEQUENCE_LENGTH:
+        indices = indices + [vocab["<PAD>"]] * (MAX_SEQUENCE_LENGTH - len(indices))
+    else:
+        indices = indices[:MAX_SEQUENCE_LENGTH]
+    return torch.LongTensor(indices).unsqueeze(0)
+
+def time_paths(paths, utterances):
+    results = {}
+    print(f"{'path':<16}{'total s':>10}{'us/utterance':>15}")
+    for label, fn in paths:
+        start = time.perf_counter()
+        results[label] = [fn(text) for text in utterances]
+        elapsed = time.perf_counter() - start
+        print(f"{label:<16}{elapsed:>10.3f}{elapsed / len(utterances) * 1e6:>15.2f}")
+    return results
+
+def benchmark_rules(utterances):
+    matcher = IntentRuleMatcher(INTENT_RULES)
+    results = time_paths((("per-rule", legacy_classify), ("single-pass", matcher.classify)), utterances)
+    mismatches = sum(a != b for a, b in zip(results["per-rule"], results["single-pass"]))
+    print(f"Mismatched intents: {mismatches}")
+
+def unpadded(tensor, pad_index):
+    indices = tensor.flatten().tolist()
+    while indices and indices[-1] == pad_index:
+        indices.pop()
+    return indices
+
+def benchmark_tokenizer(utterances, distinct):
+    vocab = {"<PAD>": 0, "<UNK>": 1}
+    for word in WORDS[::2]:
+        vocab.setdefault(word, len(vocab))
+    device = torch.device("cpu")
+    uncached = IntentTokenizer(vocab, device, cache_size=0)
+    cached = IntentTokenizer(vocab, device, cache_size=distinct)
+    # Repeated commands: cycle through a small pool of distinct utterances
+    repeated = [utterances[i % distinct] for i in range(len(utterances))]
+    results = time_paths((
+        ("legacy", lambda text: legacy_preprocess(text, vocab)),
+        ("table+map", uncached.encode),
+        ("lru (repeats)", cached.encode)
+    ), repeated)
+    # The legacy path pads to MAX_SEQUENCE_LENGTH and encode() does not, so compare the tokens only
+    pad = vocab["<PAD>"]
+    mismatches = sum(
+        unpadded(a, pad) != unpadded(b, pad) for a, b in zip(results["legacy"], results["lru (repeats)"])
+    )
+    print(f"Mismatched tensors: {mismatches}, cache {cached.stats()}")
+
+def benchmark():
+    parser = argparse.ArgumentParser(description='Compare legacy and optimized intent rule matching and tokenization')
+    parser.add_argument('--utterances', type=int, default=100000, help='Number of synthetic utterances')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the utterances')
+    parser.add_argument('--distinct', type=int, default=500, help='Distinct utterances in the repeated-command tokenizer run')
+    args = parser.parse_args()
+    utterances = make_utterances(args.utterances, args.seed)
+    print("Rule-based fallback")
+    benchmark_rules(utterances)
+    print("\nTokenization")
+    benchmark_tokenizer(utterances, args.distinct)
+
+if __name__ == '__main__':
+    benchmark()
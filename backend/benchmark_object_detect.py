@@ -0,0 +1,72 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import cv2
+
+RESOLUTIONS = {
+    "640x480": (480, 640),
+    "1080p": (1080, 1920)
+}
+
+def make_frame(height, width):
+    # Smooth gradients plus noise compress like a webcam frame rather than pure noise
+    y, x = np.mgrid[0:height, 0:width]
+    frame = np.stack([(x * 255 // width), (y * 255 // height), ((x + y) * 255 // (width + height))], axis=-1)
+    noise = np.random.randint(0, 32, size=frame.shape)
+    return np.clip(frame + noise, 0, 255).astype(np.uint8)
+
+def time_call(fn, iterations, warmup):
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.median(timings), np.percentile(timings, 95)
+
+def benchmark():
+    parser = argparse.ArgumentParser(description='Compare temp-file and in-memory YOLO inference paths')
+    parser.add_argument('--model', type=str, default='yolov8n.pt', help='YOLO weights to load')
+    parser.add_argument('--iterations', type=int, default=30, help='Timed iterations per path')
+    parser.add_argument('--warmup', type=int, default=3, help='Untimed warmup iterations per path')
+    parser.add_argument('--skip_model', action='store_true', help='Only time the temp-file round trip, without YOLO')
+    args = parser.parse_args()
+    model = None
+    if not args.skip_model:
+        from ultralytics import YOLO
+        model = YOLO(args.model)
+    temp_dir = tempfile.mkdtemp()
+    print(f"{'resolution':<12}{'path':<12}{'median ms':>12}{'p95 ms':>12}")
+    for label, (height, width) in RESOLUTIONS.items():
+        frame = make_frame(height, width)
+        temp_path = os.path.join(temp_dir, "frame.jpg")
+
+        def round_trip():
+            cv2.imwrite(temp_path, frame)
+            decoded = cv2.imread(temp_path)
+            os.remove(temp_path)
+            return decoded
+
+        def temp_file_path():
+            cv2.imwrite(temp_path, frame)
+            model(temp_path, verbose=False)
+            os.remove(temp_path)
+
+        def in_memory_path():
+            model(frame, verbose=False)
+
+        median, p95 = time_call(round_trip, args.iterations, args.warmup)
+        print(f"{label:<12}{'round trip':<12}{median:>12.2f}{p95:>12.2f}")
+        if model is not None:
+            temp_median, temp_p95 = time_call(temp_file_path, args.iterations, args.warmup)
+            memory_median, memory_p95 = time_call(in_memory_path, args.iterations, args.warmup)
+            print(f"{label:<12}{'temp file':<12}{temp_median:>12.2f}{temp_p95:>12.2f}")
+            print(f"{label:<12}{'in memory':<12}{memory_median:>12.2f}{memory_p95:>12.2f}")
+            print(f"{label:<12}{'saved':<12}{temp_median - memory_median:>12.2f}")
+    os.rmdir(temp_dir)
+
+if __name__ == "__main__":
+    benchmark()
@@ -3,8 +3,25 @@ from dotenv import load_dotenv
 load_dotenv()
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 GEMINI_MODEL = "gemini-1.5-pro"
+LLM_BACKEND = os.getenv('LLM_BACKEND', 'gemini')
+FAKE_LLM_FIRST_TOKEN_DELAY_MS = float(os.getenv('FAKE_LLM_FIRST_TOKEN_DELAY_MS', '0'))
+FAKE_LLM_TOKEN_DELAY_MS = float(os.getenv('FAKE_LLM_TOKEN_DELAY_MS', '0'))
+GEMINI_API_BASE_URL = os.getenv('GEMINI_API_BASE_URL', 'https://generativelanguage.googleapis.com')
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '3.05'))
+HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '2'))
+HTTP_RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', '0.5'))
+CIRCUIT_BREAKER_FAILURES = int(os.getenv('CIRCUIT_BREAKER_FAILURES', '5'))
+CIRCUIT_BREAKER_RESET_SECONDS = float(os.getenv('CIRCUIT_BREAKER_RESET_SECONDS', '30'))
 SPEECH_MODEL = "wav2vec2-base-960h"
+ASR_WARMUP = os.getenv('ASR_WARMUP', 'False').lower() in ('true', '1', 't')
+TORCHSCRIPT_ENABLED = os.getenv('TORCHSCRIPT_ENABLED', 'True').lower() in ('true', '1', 't')
+QUANTIZE_MODELS = os.getenv('QUANTIZE_MODELS', 'False').lower() in ('true', '1', 't')
 OBJECT_DETECTION_MODEL = "yolov8n.pt"
+OBJECT_DETECTION_MAX_BATCH_SIZE = int(os.getenv('OBJECT_DETECTION_MAX_BATCH_SIZE', '8'))
+OBJECT_DETECTION_MAX_WAIT_MS = float(os.getenv('OBJECT_DETECTION_MAX_WAIT_MS', '10'))
+OBJECT_DETECTION_MAX_PENDING = int(os.getenv('OBJECT_DETECTION_MAX_PENDING', '32'))
 FACE_RECOGNITION_THRESHOLD = 0.6
 FACE_DATABASE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'faces')
 os.makedirs(FACE_DATABASE_PATH, exist_ok=True)
@@ -12,4 +29,33 @@ AUDIO_UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'data', 'audio')
 os.makedirs(AUDIO_UPLOAD_FOLDER, exist_ok=True)
 IMAGE_UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), 'data', 'images')
 os.makedirs(IMAGE_UPLOAD_FOLDER, exist_ok=True)
+CHAT_HISTORY_PATH = os.path.join(os.path.dirname(__file__), 'data', 'chat_history')
+CHAT_CONTEXT_TURNS = int(os.getenv('CHAT_CONTEXT_TURNS', '2'))
+CONVERSATION_CACHE_MAX_USERS = int(os.getenv('CONVERSATION_CACHE_MAX_USERS', '1000'))
+CONVERSATION_CACHE_MAX_BYTES = int(os.getenv('CONVERSATION_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+CHAT_HISTORY_MAX_ENTRIES = int(os.getenv('CHAT_HISTORY_MAX_ENTRIES', '1000'))
+CHAT_HISTORY_MAX_AGE_DAYS = int(os.getenv('CHAT_HISTORY_MAX_AGE_DAYS', '0'))
+RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')
+RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '1000'))
+RESPONSE_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'response_cache.sqlite3')
+TTS_ENGINE = os.getenv('TTS_ENGINE', 'auto')
+TTS_ENGINE_POOL_SIZE = int(os.getenv('TTS_ENGINE_POOL_SIZE', '2'))
+TTS_CACHE_PATH = os.path.join(os.path.dirname(__file__), 'data', 'tts_cache')
+TTS_CACHE_MAX_BYTES = int(os.getenv('TTS_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+TTS_PREWARM = os.getenv('TTS_PREWARM', 'True').lower() in ('true', '1', 't')
+MODEL_IDLE_TTL_SECONDS = int(os.getenv('MODEL_IDLE_TTL_SECONDS', '0'))
+PRELOAD_MODELS = [name.strip() for name in os.getenv('PRELOAD_MODELS', '').split(',') if name.strip()]
+FACE_WORKERS = int(os.getenv('FACE_WORKERS', '2'))
+FACE_QUEUE_DEPTH = int(os.getenv('FACE_QUEUE_DEPTH', '8'))
+SPEECH_WORKERS = int(os.getenv('SPEECH_WORKERS', '2'))
+SPEECH_QUEUE_DEPTH = int(os.getenv('SPEECH_QUEUE_DEPTH', '8'))
+TORCH_NUM_THREADS = int(os.getenv('TORCH_NUM_THREADS', '0'))
+# Server processes sharing the machine's cores; gunicorn.conf.py sets it for its workers
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '1'))
+IO_WORKERS = int(os.getenv('IO_WORKERS', '32'))
+VOICE_PIPELINE_WORKERS = int(os.getenv('VOICE_PIPELINE_WORKERS', '8'))
+VOICE_STAGE_TIMEOUT_SECONDS = float(os.getenv('VOICE_STAGE_TIMEOUT_SECONDS', '30'))
+CAPABILITY_REFRESH_SECONDS = int(os.getenv('CAPABILITY_REFRESH_SECONDS', '300'))
+CAPABILITY_PROBE_TIMEOUT_SECONDS = float(os.getenv('CAPABILITY_PROBE_TIMEOUT_SECONDS', '5'))
 DEBUG = os.getenv('DEBUG', 'True').lower() in ('true', '1', 't')
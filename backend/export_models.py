@@ -0,0 +1,100 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+import torch
+from modules.intent_classifier import LSTMClassifier, MAX_SEQUENCE_LENGTH
+from modules.face_auth import FaceNet
+from modules.memory import FaceNetLSTM
+from modules.voice_command import AudioCNN
+from utils.model_loading import load_eager_model, torchscript_path
+
+def intent_vocab_size(vocab_path="models/intent_vocab.json"):
+    if os.path.exists(vocab_path):
+        with open(vocab_path, 'r') as f:
+            return len(json.load(f))
+    # Size of the fallback vocabulary IntentClassifier creates
+    return 41
+
+def model_specs():
+    """name -> (model class, state dict path, constructor kwargs, example input)"""
+    return {
+        "intent": (
+            LSTMClassifier, "models/intent_classifier.pth",
+            {"vocab_size": intent_vocab_size(), "embedding_dim": 100, "hidden_dim": 128, "output_dim": 16, "n_layers": 2},
+            torch.zeros(1, MAX_SEQUENCE_LENGTH, dtype=torch.long)
+        ),
+        "facenet": (FaceNet, "models/facenet.pth", {}, torch.rand(1, 3, 64, 64)),
+        "facenet_lstm": (FaceNetLSTM, "models/facenet_lstm.pth", {}, torch.rand(1, 3, 64, 64)),
+        "voice_command": (AudioCNN, "models/voice_command.pth", {"n_classes": 10}, torch.rand(1, 1, 64, 128))
+    }
+
+def export(model, example_input):
+    """Script the model, falling back to tracing if it is not scriptable"""
+    try:
+        return torch.jit.script(model)
+    except Exception as e:
+        print(f"  torch.jit.script failed ({str(e).splitlines()[0]}), tracing instead")
+        return torch.jit.trace(model, example_input)
+
+def time_inference(model, example_input, iterations, warmup):
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(example_input)
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            model(example_input)
+            timings.append((time.perf_counter() - start) * 1000)
+    return np.median(timings), np.percentile(timings, 95)
+
+def benchmark(name, model_class, model_path, model_kwargs, example_input, scripted_path, args):
+    device = torch.device("cpu")
+    start = time.perf_counter()
+    eager = load_eager_model(model_class, model_path, device, **model_kwargs)
+    eager_load_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    scripted = torch.jit.load(scripted_path, map_location=device)
+    scripted.eval()
+    scripted_load_ms = (time.perf_counter() - start) * 1000
+    for label, model, load_ms in (("eager", eager, eager_load_ms), ("torchscript", scripted, scripted_load_ms)):
+        median, p95 = time_inference(model, example_input, args.iterations, args.warmup)
+        print(f"{name:<16}{label:<14}{load_ms:>10.1f}{median:>12.3f}{p95:>12.3f}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the bundled PyTorch models to TorchScript')
+    parser.add_argument('--models', nargs='+', choices=list(model_specs()), help='Models to export (default: all)')
+    parser.add_argument('--allow_untrained', action='store_true', help='Export models whose .pth weights are missing')
+    parser.add_argument('--benchmark', action='store_true', help='Compare eager and TorchScript load time and CPU latency')
+    parser.add_argument('--iterations', type=int, default=100, help='Timed iterations per model and path')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed warmup iterations per model and path')
+    args = parser.parse_args()
+    torch.set_grad_enabled(False)
+    specs = model_specs()
+    exported = []
+    for name in args.models or specs:
+        model_class, model_path, model_kwargs, example_input = specs[name]
+        if not os.path.exists(model_path) and not args.allow_untrained:
+            print(f"Skipping {name}: {model_path} not found (use --allow_untrained to export anyway)")
+            continue
+        print(f"Exporting {name}")
+        eager = load_eager_model(model_class, model_path, torch.device("cpu"), **model_kwargs)
+        scripted = export(eager, example_input)
+        max_diff = (scripted(example_input) - eager(example_input)).abs().max().item()
+        if max_diff > 1e-4:
+            print(f"  Output differs from eager model by {max_diff:.2e}, not saving")
+            continue
+        scripted_path = torchscript_path(model_path)
+        os.makedirs(os.path.dirname(scripted_path), exist_ok=True)
+        scripted.save(scripted_path)
+        print(f"  Saved {scripted_path} (max abs diff {max_diff:.2e})")
+        exported.append(name)
+    if args.benchmark and exported:
+        print(f"\n{'model':<16}{'path':<14}{'load ms':>10}{'median ms':>12}{'p95 ms':>12}")
+        for name in exported:
+            model_class, model_path, model_kwargs, example_input = specs[name]
+            benchmark(name, model_class, model_path, model_kwargs, example_input, torchscript_path(model_path), args)
+
+if __name__ == '__main__':
+    main()
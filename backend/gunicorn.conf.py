@@ -0,0 +1,41 @@
+import os
+import multiprocessing
+
+# Production serving: gunicorn -c gunicorn.conf.py
+wsgi_app = "app:app"
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Threaded workers: network-bound requests (LLM, gTTS, SSE streams) wait on
+# threads, while CPU-bound inference goes through each worker's bounded pool
+worker_class = "gthread"
+workers = int(os.environ.get('WEB_CONCURRENCY', max(2, multiprocessing.cpu_count() // 2)))
+# Read by config.py when the app is imported, to split cores between workers
+os.environ['WEB_CONCURRENCY'] = str(workers)
+threads = int(os.environ.get('GUNICORN_THREADS', '16'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '120'))
+keepalive = 5
+
+# Import the app, and load PRELOAD_MODELS, once in the master so workers
+# share the weights copy-on-write instead of each loading their own
+preload_app = True
+
+def when_ready(server):
+    from config import PRELOAD_MODELS, ASR_WARMUP
+    from modules.model_registry import model_registry
+    models = list(PRELOAD_MODELS)
+    # ASR warmup means loading the weights, which workers then share; no
+    # inference runs here, as torch's thread pools must not exist before fork
+    if ASR_WARMUP and "asr" not in models:
+        models.append("asr")
+    if models:
+        server.log.info(f"Preloading models: {', '.join(models)}")
+        model_registry.preload(*models)
+
+def post_fork(server, worker):
+    from config import TTS_PREWARM
+    from app import start_background_tasks, start_tts_prewarm
+    start_background_tasks()
+    # The clip cache is on disk and shared, so the first worker fills it for
+    # all of them. TTS engines are per process, so it can't run in the master
+    if TTS_PREWARM and worker.age == 1:
+        start_tts_prewarm()
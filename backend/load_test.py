@@ -0,0 +1,64 @@
+import time
+import argparse
+import threading
+import numpy as np
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+ENDPOINTS = {
+    "chatbot": "/api/chatbot",
+    "gemini-chat": "/api/gemini-chat"
+}
+
+_local = threading.local()
+
+def session():
+    # One keep-alive connection per client thread
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+def send(url, index, stream):
+    payload = {
+        "message": f"load test message {index}",
+        "user_id": f"load-test-{index % 50}",
+        "history": [],
+        "cache": False,
+        "stream": stream
+    }
+    started = time.perf_counter()
+    try:
+        response = session().post(url, json=payload, timeout=60, stream=stream)
+        if stream:
+            for _ in response.iter_content(chunk_size=None):
+                pass
+        ok = response.status_code == 200
+    except requests.RequestException:
+        ok = False
+    return ok, (time.perf_counter() - started) * 1000
+
+def load_test():
+    parser = argparse.ArgumentParser(description='Measure chat endpoint throughput, e.g. against a server running LLM_BACKEND=fake')
+    parser.add_argument('--url', type=str, default='http://localhost:5000', help='Base URL of the running backend')
+    parser.add_argument('--endpoint', choices=list(ENDPOINTS), default='chatbot', help='Endpoint to exercise')
+    parser.add_argument('--requests', type=int, default=500, help='Total requests to send')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32], help='Concurrent clients, one run per value')
+    parser.add_argument('--stream', action='store_true', help='Request Server-Sent Events and read each stream to the end')
+    args = parser.parse_args()
+    url = args.url.rstrip('/') + ENDPOINTS[args.endpoint]
+    print(f"{'clients':>8}{'req/s':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for concurrency in args.concurrency:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(lambda index: send(url, index, args.stream), range(args.requests)))
+        elapsed = time.perf_counter() - started
+        latencies = np.array([latency for ok, latency in results if ok])
+        errors = sum(1 for ok, _ in results if not ok)
+        if len(latencies) == 0:
+            print(f"{concurrency:>8}{0:>10.1f}{errors:>8}{'-':>10}{'-':>10}{'-':>10}")
+            continue
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        print(f"{concurrency:>8}{len(latencies) / elapsed:>10.1f}{errors:>8}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}")
+
+if __name__ == '__main__':
+    load_test()
@@ -0,0 +1,106 @@
+import time
+import logging
+import threading
+import numpy as np
+from config import SPEECH_MODEL
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+class ASREngine:
+    """
+    Process-wide wav2vec2 speech recogniser.
+
+    Weights are loaded once, on first use (or at boot via warm_up), and
+    inference is serialised behind a lock so request threads can share it.
+    The model registry may unload() the weights when they sit idle.
+    """
+    def __init__(self, model_name=SPEECH_MODEL, sample_rate=16000):
+        self.model_id = model_name if '/' in model_name else f"facebook/{model_name}"
+        self.sample_rate = sample_rate
+        self.processor = None
+        self.model = None
+        self._load_lock = threading.Lock()
+        self._infer_lock = threading.Lock()
+        self.load_time = None
+        self.calls = 0
+        self.total_inference_ms = 0.0
+        self.last_inference_ms = 0.0
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    def load(self):
+        """Load processor and model weights if they are not loaded yet"""
+        if self.model is not None:
+            return
+        with self._load_lock:
+            if self.model is not None:
+                return
+            from transformers import Wav2Vec2ForCTC, Wav2Vec2Processor
+            started = time.perf_counter()
+            processor = Wav2Vec2Processor.from_pretrained(self.model_id)
+            model = Wav2Vec2ForCTC.from_pretrained(self.model_id)
+            model.eval()
+            self.processor = processor
+            self.model = model
+            self.load_time = time.perf_counter() - started
+            logger.info(f"Loaded ASR model {self.model_id} in {self.load_time:.2f}s")
+
+    def unload(self):
+        """Release the weights; the next transcribe() loads them again"""
+        with self._load_lock:
+            self.model = None
+            self.processor = None
+
+    def warm_up(self):
+        """Load the model and run one pass over silence so the first request is not cold"""
+        try:
+            self.load()
+            self.transcribe(np.zeros(self.sample_rate, dtype=np.float32))
+            logger.info("ASR engine warmed up")
+        except Exception as e:
+            logger.error(f"Error warming up ASR engine: {str(e)}")
+
+    def transcribe(self, waveform):
+        """
+        Transcribe a mono float32 waveform sampled at self.sample_rate
+
+        Args:
+            waveform: 1-D numpy array
+
+        Returns:
+            str: Recognised text
+        """
+        import torch
+        processor = model = None
+        while processor is None or model is None:
+            self.load()
+            # Local references keep the weights alive even if unload() runs mid-inference
+            processor, model = self.processor, self.model
+        with self._infer_lock:
+            started = time.perf_counter()
+            inputs = processor(waveform, sampling_rate=self.sample_rate, return_tensors="pt")
+            with torch.no_grad():
+                logits = model(inputs.input_values).logits
+            predicted_ids = torch.argmax(logits, dim=-1)
+            text = processor.batch_decode(predicted_ids)[0]
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.calls += 1
+            self.total_inference_ms += elapsed_ms
+            self.last_inference_ms = elapsed_ms
+        return text
+
+    def stats(self):
+        return {
+            "model": self.model_id,
+            "loaded": self.loaded,
+            "load_time_s": self.load_time,
+            "calls": self.calls,
+            "avg_inference_ms": self.total_inference_ms / self.calls if self.calls else 0.0,
+            "last_inference_ms": self.last_inference_ms
+        }
+
+asr_engine = ASREngine()
+metrics.register('asr', asr_engine.stats)
@@ -1,71 +1,48 @@
-from flask import Blueprint, request, jsonify
-import os
+from flask import Blueprint, request, jsonify, Response, stream_with_context, send_file
 import time
 import logging
-import torch
-import soundfile as sf
-import numpy as np
+import threading
 import base64
-import io
-import subprocess
-import google.generativeai as genai
-from gtts import gTTS
-from config import GEMINI_API_KEY, GEMINI_MODEL, AUDIO_UPLOAD_FOLDER
+from utils.audio_io import decode_audio, to_pcm16, AudioDecodeError, TARGET_SAMPLE_RATE
+from modules.model_registry import model_registry
+from modules.speech_synthesis import speech_synthesizer, AUDIO_MIMETYPES
+from modules.voice_pipeline import VoicePipeline
+from utils.executors import pools, PoolSaturated
+from utils.helpers import format_sse
 
 logger = logging.getLogger(__name__)
 
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-
 audio_bp = Blueprint('audio', __name__)
 
-def get_gemini_model():
+def read_uploaded_audio(audio_file):
+    """Decode an uploaded audio file to a 16 kHz mono waveform, or None on failure"""
     try:
-        return genai.GenerativeModel(GEMINI_MODEL)
-    except Exception as e:
-        logger.error(f"Error initializing Gemini model: {str(e)}")
+        return decode_audio(audio_file.read())
+    except AudioDecodeError as e:
+        logger.error(f"Error decoding audio: {str(e)}")
         return None
 
-def convert_audio_to_wav(input_file, output_file):
-    try:
-        subprocess.run(["ffmpeg", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        subprocess.run([
-            "ffmpeg", 
-            "-i", input_file, 
-            "-ar", "16000", 
-            "-ac", "1", 
-            "-y", 
-            output_file
-        ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-        return True
-    except Exception as e:
-        logger.error(f"Error converting audio with ffmpeg: {str(e)}")
-        return False
-
-def transcribe_audio_with_nlp(audio_path):
+def transcribe_audio_with_nlp(waveform):
     try:
         import speech_recognition as sr
         recognizer = sr.Recognizer()
-        with sr.AudioFile(audio_path) as source:
-            audio_data = recognizer.record(source)
-            text = recognizer.recognize_google(audio_data)
-            logger.info(f"Transcribed with Google Speech Recognition: {text}")
-            return text
+        audio_data = sr.AudioData(to_pcm16(waveform), TARGET_SAMPLE_RATE, 2)
+        text = recognizer.recognize_google(audio_data)
+        logger.info(f"Transcribed with Google Speech Recognition: {text}")
+        return text
     except ImportError:
         logger.warning("SpeechRecognition library not available, trying alternative methods")
     except Exception as e:
         logger.error(f"Error with SpeechRecognition: {str(e)}")
     try:
-        from transformers import pipeline
-        transcriber = pipeline("automatic-speech-recognition")
-        result = transcriber(audio_path)
-        text = result["text"]
-        logger.info(f"Transcribed with transformers pipeline: {text}")
+        asr_engine = model_registry.get("asr")
+        text = asr_engine.transcribe(waveform)
+        logger.info(f"Transcribed with {asr_engine.model_id}: {text}")
         return text
     except ImportError:
         logger.warning("Transformers library not available")
     except Exception as e:
-        logger.error(f"Error with transformers pipeline: {str(e)}")
+        logger.error(f"Error with wav2vec2 ASR engine: {str(e)}")
     return "Speech recognition failed. Please ensure required libraries are installed."
 
 @audio_bp.route('/transcribe', methods=['POST'])
@@ -76,44 +53,127 @@ def transcribe():
         audio_file = request.files['audio']
         if audio_file.filename == '':
             return jsonify({"error": "No audio file selected"}), 400
-        temp_input_path = os.path.join(AUDIO_UPLOAD_FOLDER, f"temp_input_{int(time.time())}")
-        temp_output_path = os.path.join(AUDIO_UPLOAD_FOLDER, f"temp_output_{int(time.time())}.wav")
-        audio_file.save(temp_input_path)
-        conversion_success = convert_audio_to_wav(temp_input_path, temp_output_path)
-        if not conversion_success:
+        waveform = pools["speech"].run(read_uploaded_audio, audio_file)
+        if waveform is None:
             return jsonify({"transcription": "Audio conversion failed. Please try a different format."}), 200
-        transcription = transcribe_audio_with_nlp(temp_output_path)
-        try:
-            os.remove(temp_input_path)
-            os.remove(temp_output_path)
-        except:
-            pass
+        transcription = pools["speech"].run(transcribe_audio_with_nlp, waveform)
         return jsonify({"transcription": transcription}), 200
+    except PoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Error in transcription: {str(e)}")
         return jsonify({"transcription": "I couldn't process that audio. Please try again."}), 200
 
-@audio_bp.route('/tts', methods=['POST'])
+def wants_audio(data):
+    """Raw audio for GET requests (e.g. an <audio> src), "binary": true, or an audio/* Accept header"""
+    binary = str(data.get('binary', '')).lower() in ('true', '1')
+    return request.method == 'GET' or binary or request.accept_mimetypes.best in AUDIO_MIMETYPES.values()
+
+def send_audio(text, voice):
+    """
+    Respond with the clip as audio/mpeg or audio/wav rather than base64 JSON.
+
+    A cached clip is sent as a file with Content-Length, ETag and Range
+    support; a Range request for an uncached clip synthesizes it fully
+    first. Otherwise the clip is streamed sentence by sentence as it is
+    synthesized, and cached for the next request.
+    """
+    mimetype = AUDIO_MIMETYPES[speech_synthesizer.format]
+    path = speech_synthesizer.lookup(text, voice)
+    if path is None and request.range is not None:
+        path = speech_synthesizer.cached_path(text, voice)
+    if path is not None:
+        return send_file(path, mimetype=mimetype, conditional=True, etag=speech_synthesizer.key(text, voice))
+    chunks = speech_synthesizer.stream(text, voice)
+    # Synthesize the first sentence before committing to a 200, so failures still get a JSON error
+    first = next(chunks)
+
+    def generate():
+        yield first
+        yield from chunks
+    return Response(generate(), mimetype=mimetype, headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@audio_bp.route('/tts', methods=['GET', 'POST'])
 def text_to_speech():
     try:
-        data = request.json
+        data = request.args.to_dict() if request.method == 'GET' else request.json
         if not data or 'text' not in data:
             return jsonify({"error": "Invalid request. 'text' is required"}), 400
         text = data.get('text')
-        tts = gTTS(text=text, lang='en')
-        mp3_fp = io.BytesIO()
-        tts.write_to_fp(mp3_fp)
-        mp3_fp.seek(0)
-        audio_base64 = base64.b64encode(mp3_fp.read()).decode('utf-8')
+        voice = data.get('voice', 'default')
+        if wants_audio(data):
+            return send_audio(text, voice)
+        audio_bytes = speech_synthesizer.synthesize(text, voice)
+        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
         return jsonify({
             "audio": audio_base64,
-            "format": "mp3",
+            "format": speech_synthesizer.format,
             "text": text
         })
     except Exception as e:
         logger.error(f"Error in text-to-speech: {str(e)}")
         return jsonify({"error": f"Error generating speech: {str(e)}"}), 500
 
+def wants_stream():
+    return request.form.get('stream', '').lower() in ('true', '1') or request.accept_mimetypes.best == 'text/event-stream'
+
+_voice_pipeline = None
+_voice_pipeline_lock = threading.Lock()
+
+def get_voice_pipeline():
+    """Return the process-wide voice command pipeline"""
+    global _voice_pipeline
+    if _voice_pipeline is None:
+        with _voice_pipeline_lock:
+            if _voice_pipeline is None:
+                _voice_pipeline = VoicePipeline(
+                    transcribe_audio_with_nlp, speech_synthesizer.synthesize, speech_synthesizer.format
+                )
+    return _voice_pipeline
+
+def set_voice_pipeline(pipeline):
+    """Swap the process-wide pipeline, e.g. for one built from stub stages in tests"""
+    global _voice_pipeline
+    with _voice_pipeline_lock:
+        _voice_pipeline = pipeline
+
+def stream_voice_reply(pipeline, transcription, asr_ms):
+    """
+    Relay the reply as Server-Sent Events: a "transcript" event, then one
+    message per sentence with its base64 audio as soon as it is synthesized,
+    then a "done" event with the same fields as the JSON response (minus the
+    audio), or an "error" event.
+    """
+    def generate():
+        yield format_sse({"command": transcription}, event="transcript")
+        try:
+            for event, data in pipeline.respond(transcription, asr_ms):
+                if event == "sentence":
+                    audio = data["audio"]
+                    yield format_sse({
+                        "index": data["index"],
+                        "text": data["text"],
+                        "audio": base64.b64encode(audio).decode('utf-8') if audio else None,
+                        "format": pipeline.audio_format
+                    })
+                else:
+                    data["timestamp"] = time.strftime("%Y-%m-%d %H:%M:%S")
+                    yield format_sse(data, event="done")
+        except Exception as e:
+            logger.error(f"Error streaming voice command response: {str(e)}")
+            yield format_sse({
+                "command": transcription,
+                "intent": "general_query",
+                "response": f"I heard: '{transcription}', but I'm having trouble processing your request."
+            }, event="error")
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
 @audio_bp.route('/voice-command', methods=['POST'])
 def voice_command():
     try:
@@ -122,75 +182,45 @@ def voice_command():
         audio_file = request.files['audio']
         if audio_file.filename == '':
             return jsonify({"error": "No audio file selected"}), 400
-        temp_input_path = os.path.join(AUDIO_UPLOAD_FOLDER, f"temp_input_{int(time.time())}")
-        temp_output_path = os.path.join(AUDIO_UPLOAD_FOLDER, f"temp_output_{int(time.time())}.wav")
-        audio_file.save(temp_input_path)
-        conversion_success = convert_audio_to_wav(temp_input_path, temp_output_path)
-        if not conversion_success:
+        waveform = pools["speech"].run(read_uploaded_audio, audio_file)
+        if waveform is None:
             return jsonify({
                 "command": "Audio conversion failed",
                 "intent": "error",
                 "response": "I couldn't process that audio format. Please try a different format."
             }), 200
-        transcription = transcribe_audio_with_nlp(temp_output_path)
-        try:
-            os.remove(temp_input_path)
-            os.remove(temp_output_path)
-        except:
-            pass
+        pipeline = get_voice_pipeline()
+        started = time.perf_counter()
+        transcription = pools["speech"].run(pipeline.transcribe, waveform)
+        asr_ms = (time.perf_counter() - started) * 1000
         if not transcription or len(transcription.strip()) < 2:
             return jsonify({
                 "command": "Empty transcription",
                 "intent": "error",
                 "response": "I didn't hear anything. Please try speaking again."
             }), 200
-        model = get_gemini_model()
-        if not model:
-            return jsonify({
-                "command": transcription,
-                "intent": "general_query",
-                "response": "I understood what you said, but I'm having trouble generating a response right now."
-            }), 200
+        if wants_stream():
+            return stream_voice_reply(pipeline, transcription, asr_ms)
         try:
-            prompt = f"""
-            The user said: "{transcription}"
-            
-            1. Identify the intent of this voice command.
-            2. Provide a helpful response.
-            
-            Format your response as:
-            Intent: [intent_category]
-            Response: [your helpful response]
-            """
-            response = model.generate_content(prompt)
-            response_text = response.text
-            intent = "general_query"
-            gemini_response = response_text
-            if "Intent:" in response_text and "Response:" in response_text:
-                intent_part = response_text.split("Intent:")[1].split("Response:")[0].strip()
-                response_part = response_text.split("Response:")[1].strip()
-                intent = intent_part.lower().replace(" ", "_")
-                gemini_response = response_part
-            tts = gTTS(text=gemini_response, lang='en')
-            mp3_fp = io.BytesIO()
-            tts.write_to_fp(mp3_fp)
-            mp3_fp.seek(0)
-            audio_base64 = base64.b64encode(mp3_fp.read()).decode('utf-8')
+            # On this request's thread: collect blocks on the pipeline's own pools
+            reply = pipeline.collect(transcription, asr_ms)
             return jsonify({
                 "command": transcription,
-                "intent": intent,
-                "response": gemini_response,
-                "audio": audio_base64,
-                "format": "mp3",
+                "intent": reply["intent"],
+                "response": reply["response"],
+                "audio": base64.b64encode(reply["audio"]).decode('utf-8'),
+                "format": reply["format"],
                 "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
             })
         except Exception as e:
-            logger.error(f"Error processing with Gemini: {str(e)}")
+            logger.error(f"Error processing voice command reply: {str(e)}")
             return jsonify({
                 "command": transcription,
                 "intent": "general_query",
                 "response": f"I heard: '{transcription}', but I'm having trouble processing your request."
             }), 200
+    except PoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Error in voice command: {str(e)}")
         return jsonify({
@@ -0,0 +1,146 @@
+import math
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from utils.executors import PoolSaturated
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Collects items submitted from many request threads into small batches.
+
+    A single worker thread waits for the first item, then keeps collecting
+    until max_batch_size items are queued or max_wait_ms has passed since
+    that first item, and calls batch_fn once with the whole list. batch_fn
+    must return one result per item, in order; each caller gets its own
+    result (or the batch's exception) through a Future.
+
+    With max_pending set, at most that many items may be queued or running;
+    submit() rejects further items with PoolSaturated instead of letting
+    the queue grow.
+    """
+    def __init__(self, batch_fn, max_batch_size=8, max_wait_ms=10.0, name="batcher", max_pending=None):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending) if max_pending else None
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self.pending = 0
+        self.rejected = 0
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.largest_batch = 0
+        self.total_batch_ms = 0.0
+        self.total_wait_ms = 0.0
+        self.last_batch_size = 0
+        self.last_batch_ms = 0.0
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            with self._lock:
+                if self._worker is None or not self._worker.is_alive():
+                    self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._worker.start()
+
+    def retry_after(self):
+        """Seconds until the items ahead are likely to have run, from the average batch time"""
+        with self._lock:
+            average_s = self.total_batch_ms / self.batches / 1000 if self.batches else 1.0
+            backlog = math.ceil(self.pending / self.max_batch_size)
+        return min(60, max(1, math.ceil(average_s * backlog)))
+
+    def _release(self, _future):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def submit(self, item):
+        """
+        Queue one item; returns a Future resolved with its result
+
+        Raises:
+            PoolSaturated: If max_pending items are already queued or running
+        """
+        future = Future()
+        if self._slots is not None:
+            if not self._slots.acquire(blocking=False):
+                with self._lock:
+                    self.rejected += 1
+                raise PoolSaturated(self.name, self.retry_after())
+            with self._lock:
+                self.pending += 1
+            future.add_done_callback(self._release)
+        self._ensure_worker()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name} returned {len(results)} results for {len(items)} items")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Error running {self.name} batch of {len(items)}: {str(e)}")
+                with self._lock:
+                    self.errors += 1
+                for _, future, _ in batch:
+                    future.set_exception(e)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.batches += 1
+                self.items += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+                self.last_batch_size = len(batch)
+                self.last_batch_ms = elapsed_ms
+                self.total_batch_ms += elapsed_ms
+                self.total_wait_ms += sum((started - queued) * 1000 for _, _, queued in batch)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self.batches,
+                "items": self.items,
+                "errors": self.errors,
+                "queued": self._queue.qsize(),
+                "max_pending": self.max_pending,
+                "rejected": self.rejected,
+                "largest_batch": self.largest_batch,
+                "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+                "avg_batch_ms": self.total_batch_ms / self.batches if self.batches else 0.0,
+                "avg_queue_wait_ms": self.total_wait_ms / self.items if self.items else 0.0,
+                "last_batch_size": self.last_batch_size,
+                "last_batch_ms": self.last_batch_ms
+            }
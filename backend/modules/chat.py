@@ -1,21 +1,74 @@
-from flask import Blueprint, request, jsonify
-import google.generativeai as genai
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 import logging
 import time
-from config import GEMINI_API_KEY, GEMINI_MODEL
+from datetime import datetime
+from config import CHAT_HISTORY_PATH, CHAT_CONTEXT_TURNS, CONVERSATION_CACHE_MAX_USERS, CONVERSATION_CACHE_MAX_BYTES
+from modules.llm import get_llm_backend, timed_stream
+from modules.chat_history import ChatHistoryStore
+from modules.conversation_cache import ConversationCache
+from modules.response_cache import create_response_cache
+from utils import metrics
+from utils.helpers import format_sse
 
 logger = logging.getLogger(__name__)
 
-genai.configure(api_key=GEMINI_API_KEY)
-
 chat_bp = Blueprint('chat', __name__)
 
-def get_gemini_model():
-    try:
-        return genai.GenerativeModel(GEMINI_MODEL)
-    except Exception as e:
-        logger.error(f"Error initializing Gemini model: {str(e)}")
-        return None
+# Server-side context for /gemini-chat requests that don't send their own history
+conversations = ConversationCache(
+    ChatHistoryStore(CHAT_HISTORY_PATH),
+    window_turns=CHAT_CONTEXT_TURNS,
+    max_users=CONVERSATION_CACHE_MAX_USERS,
+    max_bytes=CONVERSATION_CACHE_MAX_BYTES
+)
+metrics.register('conversation_cache', conversations.stats)
+
+# Replies to stateless /chatbot prompts; None when RESPONSE_CACHE_BACKEND is 'none'
+response_cache = create_response_cache()
+
+def remember_turn(user_id, user_message, response_text):
+    timestamp = datetime.now().isoformat()
+    conversations.append(
+        user_id,
+        {"role": "user", "content": user_message, "timestamp": timestamp},
+        {"role": "assistant", "content": response_text, "timestamp": timestamp}
+    )
+
+def wants_stream(data):
+    return bool(data.get('stream')) or request.accept_mimetypes.best == 'text/event-stream'
+
+def stream_reply(chunks, user_id, on_done=None):
+    """
+    Relay model output to the client as Server-Sent Events: one "token"
+    message per chunk, then a "done" event carrying the full response in the
+    same shape as the JSON endpoint, or an "error" event. on_done, if given,
+    is called with the full response text once the stream completes.
+    """
+    def generate():
+        parts = []
+        ttft_ms = None
+        try:
+            for chunk, first_ms in timed_stream(chunks):
+                if first_ms is not None:
+                    ttft_ms = first_ms
+                parts.append(chunk)
+                yield format_sse({"token": chunk})
+            response_text = "".join(parts)
+            if on_done is not None:
+                on_done(response_text)
+            yield format_sse({
+                "response": response_text,
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "user_id": user_id,
+                "ttft_ms": ttft_ms
+            }, event="done")
+        except Exception as e:
+            logger.error(f"Error streaming chat response: {str(e)}")
+            yield format_sse({"error": f"Error processing request: {str(e)}"}, event="error")
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
 
 @chat_bp.route('/gemini-chat', methods=['POST'])
 def gemini_chat():
@@ -24,21 +77,33 @@ def gemini_chat():
         if not data or 'message' not in data:
             return jsonify({"error": "Invalid request. 'message' is required"}), 400
         user_message = data.get('message')
-        user_id = data.get('user_id', 'guest')
-        history = data.get('history', [])
-        chat_history = []
-        for msg in history:
-            if msg['role'] == 'user':
-                chat_history.append({'role': 'user', 'parts': [msg['content']]})
-            else:
-                chat_history.append({'role': 'model', 'parts': [msg['content']]})
-        model = get_gemini_model()
-        if not model:
-            return jsonify({"error": "Failed to initialize Gemini model"}), 500
-        chat = model.start_chat(history=chat_history)
-        response = chat.send_message(user_message)
+        user_id = data.get('user_id')
+        history = data.get('history')
+        on_done = None
+        if history is None and user_id:
+            # No client-side history: use the cached server-side window and record this turn
+            chat_history = conversations.window(user_id)
+            on_done = lambda response_text: remember_turn(user_id, user_message, response_text)
+        elif history is None:
+            # Anonymous callers would all share one conversation, so they get none
+            chat_history = []
+            user_id = 'guest'
+        else:
+            user_id = user_id or 'guest'
+            chat_history = []
+            for msg in history:
+                if msg['role'] == 'user':
+                    chat_history.append({'role': 'user', 'parts': [msg['content']]})
+                else:
+                    chat_history.append({'role': 'model', 'parts': [msg['content']]})
+        backend = get_llm_backend()
+        if wants_stream(data):
+            return stream_reply(backend.stream(user_message, history=chat_history), user_id, on_done)
+        response_text = backend.generate(user_message, history=chat_history)
+        if on_done is not None:
+            on_done(response_text)
         return jsonify({
-            "response": response.text,
+            "response": response_text,
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
             "user_id": user_id
         })
@@ -54,12 +119,25 @@ def chatbot():
             return jsonify({"error": "Invalid request. 'message' is required"}), 400
         user_message = data.get('message')
         user_id = data.get('user_id', 'guest')
-        model = get_gemini_model()
-        if not model:
-            return jsonify({"error": "Failed to initialize Gemini model"}), 500
-        response = model.generate_content(user_message)
+        backend = get_llm_backend()
+        model_name = f"{backend.name}:{getattr(backend, 'model_name', '')}"
+        use_cache = response_cache is not None and data.get('cache', True) is not False
+        if response_cache is not None and not use_cache:
+            response_cache.record_bypass()
+        cached = response_cache.get(user_message, model_name) if use_cache else None
+        if wants_stream(data):
+            if cached is not None:
+                return stream_reply(iter([cached]), user_id)
+            on_done = (lambda response_text: response_cache.set(user_message, model_name, response_text)) if use_cache else None
+            return stream_reply(backend.stream(user_message), user_id, on_done)
+        if cached is not None:
+            response_text = cached
+        else:
+            response_text = backend.generate(user_message)
+            if use_cache:
+                response_cache.set(user_message, model_name, response_text)
         return jsonify({
-            "response": response.text,
+            "response": response_text,
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
             "user_id": user_id
         })
@@ -0,0 +1,232 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from config import CHAT_HISTORY_MAX_ENTRIES, CHAT_HISTORY_MAX_AGE_DAYS
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger("JARVIS.ChatHistory")
+
+class ChatHistoryStore:
+    """
+    Append-only per-user chat log stored as <user_id>.jsonl.
+
+    Each turn is one appended line, so writing costs O(entry) rather than
+    O(history). tail() reads backwards from the end of the file and parses
+    only the entries it returns. Logs are compacted down to the retention
+    policy once enough lines have accumulated past it.
+
+    Several server processes may share the directory: every access holds
+    flock on the log, and compaction swaps in a new file under an exclusive
+    lock, so anyone who locked the old file reopens the path and retries.
+    """
+    def __init__(self, history_path, max_entries=CHAT_HISTORY_MAX_ENTRIES, max_age_days=CHAT_HISTORY_MAX_AGE_DAYS):
+        os.makedirs(history_path, exist_ok=True)
+        self.history_path = history_path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._appends_since_compact = {}
+
+    def _log_path(self, user_id):
+        return os.path.join(self.history_path, f"{user_id}.jsonl")
+
+    def _legacy_path(self, user_id):
+        return os.path.join(self.history_path, f"{user_id}.json")
+
+    def _lock_for(self, user_id):
+        with self._locks_guard:
+            lock = self._locks.get(user_id)
+            if lock is None:
+                lock = self._locks[user_id] = threading.Lock()
+            return lock
+
+    def _open_locked(self, log_path, mode, shared=False):
+        """
+        Open the log and flock it, reopening if compaction replaced the file
+        while we waited for the lock. Closing the file releases the lock.
+        """
+        while True:
+            f = open(log_path, mode)
+            if fcntl is None:
+                return f
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                current = os.stat(log_path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current == os.fstat(f.fileno()).st_ino:
+                return f
+            f.close()
+
+    def _migrate_legacy(self, user_id):
+        legacy_path = self._legacy_path(user_id)
+        log_path = self._log_path(user_id)
+        if not os.path.exists(legacy_path) or os.path.exists(log_path):
+            return
+        try:
+            with open(legacy_path, 'r') as f:
+                entries = json.load(f)
+            # Another process may be migrating the same user; only one log wins
+            if self._rewrite(user_id, entries, exclusive=True):
+                logger.info(f"Migrated {len(entries)} chat history entries for {user_id} to JSONL")
+            os.remove(legacy_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error migrating chat history for {user_id}: {str(e)}")
+
+    def _rewrite(self, user_id, entries, exclusive=False):
+        """
+        Write entries to a private temp file and move it over the log
+
+        Returns:
+            bool: False if exclusive and the log already existed
+        """
+        log_path = self._log_path(user_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.history_path, prefix=f".{user_id}.", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + '\n')
+            if not exclusive:
+                os.replace(tmp_path, log_path)
+                return True
+            try:
+                os.link(tmp_path, log_path)
+                return True
+            except FileExistsError:
+                return False
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def signature(self, user_id):
+        """
+        (inode, size) of the user's log, or None if it is missing or empty.
+        Appends grow the size and compaction swaps the inode, so an unchanged
+        signature means the log holds the same entries.
+        """
+        try:
+            stat = os.stat(self._log_path(user_id))
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_size) if stat.st_size else None
+
+    def append(self, user_id, *entries):
+        """
+        Append entries to the user's log in a single write
+
+        Returns:
+            tuple: (before, after) signatures of the log around this write,
+            taken under the file lock so no other writer falls between them
+        """
+        payload = ''.join(json.dumps(entry) + '\n' for entry in entries).encode('utf-8')
+        with self._lock_for(user_id):
+            self._migrate_legacy(user_id)
+            with self._open_locked(self._log_path(user_id), 'ab') as f:
+                stat = os.fstat(f.fileno())
+                before = (stat.st_ino, stat.st_size) if stat.st_size else None
+                f.write(payload)
+                f.flush()
+                after = (stat.st_ino, stat.st_size + len(payload))
+            appended = self._appends_since_compact.get(user_id, 0) + len(entries)
+            self._appends_since_compact[user_id] = appended
+            if self.max_entries and appended >= self.max_entries:
+                self._compact_locked(user_id)
+                after = self.signature(user_id)
+            return before, after
+
+    def tail(self, user_id, n):
+        """Return the last n entries, oldest first, reading only the end of the log"""
+        if n <= 0:
+            return []
+        with self._lock_for(user_id):
+            self._migrate_legacy(user_id)
+        log_path = self._log_path(user_id)
+        if not os.path.exists(log_path):
+            return []
+        try:
+            with self._open_locked(log_path, 'rb', shared=True) as f:
+                f.seek(0, os.SEEK_END)
+                position = f.tell()
+                data = b''
+                block_size = 4096
+                # n entries need n newlines plus the one ending the entry before them
+                while position > 0 and data.count(b'\n') <= n:
+                    read_size = min(block_size, position)
+                    position -= read_size
+                    f.seek(position)
+                    data = f.read(read_size) + data
+            lines = data.split(b'\n')
+            # Drop a trailing line still being written by a lock-less writer
+            lines = [line for line in lines[:-1] if line.strip()]
+            if position > 0:
+                # The first line may be cut off by the block boundary
+                lines = lines[1:]
+            return [json.loads(line) for line in lines[-n:]]
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            logger.error(f"Error loading chat history: {str(e)}")
+            return []
+
+    def read_all(self, user_id):
+        """Return every entry in the user's log, oldest first"""
+        with self._lock_for(user_id):
+            self._migrate_legacy(user_id)
+            try:
+                with self._open_locked(self._log_path(user_id), 'rb', shared=True) as f:
+                    return self._parse(user_id, f)
+            except FileNotFoundError:
+                return []
+
+    def _parse(self, user_id, f):
+        entries = []
+        for line in f:
+            if line.strip():
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Skipping corrupt chat history line for {user_id}")
+        return entries
+
+    def _retained(self, entries):
+        if self.max_age_days:
+            cutoff = (datetime.now() - timedelta(days=self.max_age_days)).isoformat()
+            entries = [entry for entry in entries if entry.get('timestamp', cutoff) >= cutoff]
+        if self.max_entries:
+            entries = entries[-self.max_entries:]
+        return entries
+
+    def compact(self, user_id):
+        """Rewrite the user's log keeping only entries within the retention policy"""
+        with self._lock_for(user_id):
+            self._migrate_legacy(user_id)
+            return self._compact_locked(user_id)
+
+    def _compact_locked(self, user_id):
+        try:
+            # Held until the new file is in place so no append to the old one is lost
+            with self._open_locked(self._log_path(user_id), 'rb') as f:
+                entries = self._parse(user_id, f)
+                retained = self._retained(entries)
+                if len(retained) != len(entries):
+                    self._rewrite(user_id, retained)
+            if len(retained) != len(entries):
+                logger.info(f"Compacted chat history for {user_id}: {len(entries)} -> {len(retained)} entries")
+            self._appends_since_compact[user_id] = 0
+            return len(entries) - len(retained)
+        except FileNotFoundError:
+            self._appends_since_compact[user_id] = 0
+            return 0
+        except Exception as e:
+            logger.error(f"Error compacting chat history for {user_id}: {str(e)}")
+            return 0
@@ -1,9 +1,11 @@
 import os
-import json
 import logging
-import requests
 import random
 from datetime import datetime
+from config import GEMINI_API_BASE_URL, CHAT_CONTEXT_TURNS, CONVERSATION_CACHE_MAX_USERS, CONVERSATION_CACHE_MAX_BYTES
+from modules.chat_history import ChatHistoryStore
+from modules.conversation_cache import ConversationCache, gemini_rest_content
+from modules.http_client import get_http_client, CircuitOpenError
 
 logger = logging.getLogger("JARVIS.Chatbot")
 
@@ -12,8 +14,17 @@ class Chatbot:
         self.api_key = api_key or os.environ.get("GEMINI_API_KEY")
         if not self.api_key:
             logger.warning("No Gemini API key provided. Using fallback responses.")
-        os.makedirs(history_path, exist_ok=True)
         self.history_path = history_path
+        self.history = ChatHistoryStore(history_path)
+        # Previous turns sent to the model along with the new message
+        self.context_turns = CHAT_CONTEXT_TURNS
+        self.conversations = ConversationCache(
+            self.history,
+            window_turns=self.context_turns,
+            max_users=CONVERSATION_CACHE_MAX_USERS,
+            max_bytes=CONVERSATION_CACHE_MAX_BYTES,
+            to_content=gemini_rest_content
+        )
         self.fallback_responses = {
             "greeting": [
                 "Hello! How can I assist you today?",
@@ -62,43 +73,21 @@ class Chatbot:
             ]
         }
 
-    def _load_history(self, user_id):
-        history_file = os.path.join(self.history_path, f"{user_id}.json")
-        if os.path.exists(history_file):
-            try:
-                with open(history_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                logger.error(f"Error loading chat history: {str(e)}")
-        return []
-
-    def _save_history(self, user_id, history):
-        history_file = os.path.join(self.history_path, f"{user_id}.json")
-        try:
-            with open(history_file, 'w') as f:
-                json.dump(history, f)
-        except Exception as e:
-            logger.error(f"Error saving chat history: {str(e)}")
-
     def get_response(self, message, user_id="guest"):
-        history = self._load_history(user_id)
-        history.append({
+        user_entry = {
             "role": "user",
             "content": message,
             "timestamp": datetime.now().isoformat()
-        })
+        }
         if self.api_key:
             try:
-                messages = []
-                for entry in history[-5:]:
-                    role = "user" if entry["role"] == "user" else "model"
-                    messages.append({"role": role, "parts": [{"text": entry["content"]}]})
+                messages = self.conversations.window(user_id) + [gemini_rest_content(user_entry)]
                 if not any(msg.get("role") == "system" for msg in messages):
                     messages.insert(0, {
                         "role": "system",
                         "parts": [{"text": "You are JARVIS, an AI assistant. Be helpful, concise, and friendly."}]
                     })
-                url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent"
+                url = f"{GEMINI_API_BASE_URL}/v1beta/models/gemini-pro:generateContent"
                 headers = {
                     "Content-Type": "application/json",
                     "x-goog-api-key": self.api_key
@@ -112,7 +101,7 @@ class Chatbot:
                         "maxOutputTokens": 1024
                     }
                 }
-                response = requests.post(url, headers=headers, json=data)
+                response = get_http_client().post(url, headers=headers, json=data)
                 response_json = response.json()
                 if response.status_code == 200 and "candidates" in response_json:
                     bot_response = response_json["candidates"][0]["content"]["parts"][0]["text"]
@@ -120,17 +109,19 @@ class Chatbot:
                 else:
                     logger.warning(f"Error from Gemini API: {response_json.get('error', {}).get('message', 'Unknown error')}")
                     bot_response = self._get_fallback_response(message)
+            except CircuitOpenError:
+                logger.warning("Gemini API circuit is open, using fallback response")
+                bot_response = self._get_fallback_response(message)
             except Exception as e:
                 logger.error(f"Error calling Gemini API: {str(e)}")
                 bot_response = self._get_fallback_response(message)
         else:
             bot_response = self._get_fallback_response(message)
-        history.append({
+        self.conversations.append(user_id, user_entry, {
             "role": "assistant",
             "content": bot_response,
             "timestamp": datetime.now().isoformat()
         })
-        self._save_history(user_id, history)
         return bot_response
 
     def _get_fallback_response(self, message):
@@ -0,0 +1,129 @@
+import json
+import logging
+import threading
+from collections import OrderedDict, deque
+
+logger = logging.getLogger("JARVIS.ConversationCache")
+
+# Rough per-turn bookkeeping cost on top of the message text
+ENTRY_OVERHEAD_BYTES = 64
+
+def gemini_sdk_content(entry):
+    """History entry -> google.generativeai chat history item"""
+    role = "user" if entry["role"] == "user" else "model"
+    return {"role": role, "parts": [entry["content"]]}
+
+def gemini_rest_content(entry):
+    """History entry -> generateContent REST `contents` item"""
+    role = "user" if entry["role"] == "user" else "model"
+    return {"role": role, "parts": [{"text": entry["content"]}]}
+
+class ConversationCache:
+    """
+    Bounded LRU of each active user's most recent turns, kept already
+    converted into LLM `contents` items.
+
+    A window holds the last window_turns turns, each a user message and
+    the assistant's reply. Reads of a cached user cost one stat of the
+    user's log and no JSON; the window is (re)loaded from the backing
+    ChatHistoryStore on a miss or when the log's signature shows another
+    process has written to it since. Appends are written through to the
+    store before the cached window is updated. Users are evicted
+    least-recently-used first when either max_users or max_bytes is
+    exceeded.
+    """
+    def __init__(self, store, window_turns=2, max_users=1000, max_bytes=16 * 1024 * 1024, to_content=gemini_sdk_content):
+        self.store = store
+        self.window_turns = window_turns
+        self.window_entries = 2 * window_turns
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self.to_content = to_content
+        self._windows = OrderedDict()
+        self._sizes = {}
+        # Log signature each cached window was read at or brought up to
+        self._signatures = {}
+        self._lock = threading.Lock()
+        # Serialises store writes with loading windows on a miss, so a load
+        # can't miss an append that lands between its read and its insert
+        self._write_lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _entry_size(self, content):
+        return ENTRY_OVERHEAD_BYTES + len(json.dumps(content["parts"]))
+
+    def _store_window(self, user_id, window, signature):
+        self._signatures[user_id] = signature
+        size = sum(self._entry_size(content) for content in window)
+        self.total_bytes += size - self._sizes.get(user_id, 0)
+        self._sizes[user_id] = size
+        self._windows[user_id] = window
+        self._windows.move_to_end(user_id)
+        while self._windows and (len(self._windows) > self.max_users or self.total_bytes > self.max_bytes):
+            evicted, _ = self._windows.popitem(last=False)
+            self.total_bytes -= self._sizes.pop(evicted)
+            self._signatures.pop(evicted, None)
+            self.evictions += 1
+
+    def window(self, user_id):
+        """Return the user's recent turns as a list of contents items, oldest first"""
+        signature = self.store.signature(user_id)
+        with self._lock:
+            window = self._windows.get(user_id)
+            if window is not None and self._signatures.get(user_id) == signature:
+                self.hits += 1
+                self._windows.move_to_end(user_id)
+                return list(window)
+            self.misses += 1
+        with self._write_lock:
+            # Taken before reading, so a write landing mid-read only forces another reload
+            signature = self.store.signature(user_id)
+            with self._lock:
+                # Another request may have brought the window up to date meanwhile; prefer it
+                cached = self._windows.get(user_id)
+                if cached is not None and self._signatures.get(user_id) == signature:
+                    return list(cached)
+            entries = self.store.tail(user_id, self.window_entries)
+            window = deque((self.to_content(entry) for entry in entries), maxlen=self.window_entries)
+            with self._lock:
+                self._store_window(user_id, window, signature)
+        return list(window)
+
+    def append(self, user_id, *entries):
+        """Persist entries, then extend the cached window if it was up to date"""
+        with self._write_lock:
+            before, after = self.store.append(user_id, *entries)
+            with self._lock:
+                window = self._windows.get(user_id)
+                if window is None:
+                    return
+                if self._signatures.get(user_id) != before:
+                    # Another process wrote in between; the next read reloads
+                    self._drop(user_id)
+                    return
+                window.extend(self.to_content(entry) for entry in entries)
+                self._store_window(user_id, window, after)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._drop(user_id)
+
+    def _drop(self, user_id):
+        if self._windows.pop(user_id, None) is not None:
+            self.total_bytes -= self._sizes.pop(user_id)
+            self._signatures.pop(user_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self._windows),
+                "bytes": self.total_bytes,
+                "max_users": self.max_users,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
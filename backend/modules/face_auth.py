@@ -9,6 +9,7 @@ import logging
 from io import BytesIO
 from PIL import Image
 from datetime import datetime
+from utils.model_loading import load_model
 
 logger = logging.getLogger("JARVIS.FaceAuth")
 
@@ -43,13 +44,7 @@ class FaceAuthenticator:
         logger.info(f"Using device: {self.device}")
         os.makedirs(os.path.dirname(model_path), exist_ok=True)
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        self.model = FaceNet().to(self.device)
-        if os.path.exists(model_path):
-            logger.info(f"Loading face model from {model_path}")
-            self.model.load_state_dict(torch.load(model_path, map_location=self.device))
-        else:
-            logger.warning(f"Model not found at {model_path}, using untrained model")
-        self.model.eval()
+        self.model = load_model(FaceNet, model_path, self.device)
         self.db_path = db_path
         self.face_db = {}
         
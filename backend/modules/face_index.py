@@ -0,0 +1,127 @@
+import threading
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class FaceIndex:
+    """In-memory matrix of enrolled face encodings for batched nearest-match lookups"""
+    def __init__(self, dim=128, initial_capacity=64):
+        self.dim = dim
+        self._lock = threading.RLock()
+        self._matrix = np.empty((initial_capacity, dim), dtype=np.float64)
+        self._ids = np.empty(initial_capacity, dtype=object)
+        self._positions = {}
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, user_id):
+        return user_id in self._positions
+
+    def _grow(self, min_capacity):
+        capacity = max(min_capacity, 2 * self._matrix.shape[0], 1)
+        matrix = np.empty((capacity, self.dim), dtype=self._matrix.dtype)
+        matrix[:self._size] = self._matrix[:self._size]
+        ids = np.empty(capacity, dtype=object)
+        ids[:self._size] = self._ids[:self._size]
+        self._matrix = matrix
+        self._ids = ids
+
+    def _ensure_writable(self):
+        # Adopted memory-mapped storage is read-only; copy it on first write
+        if not self._matrix.flags.writeable:
+            self._grow(self._matrix.shape[0])
+
+    def adopt(self, ids, matrix):
+        """Use an existing (n, dim) array, e.g. a read-only np.memmap, as storage without copying"""
+        if matrix.ndim != 2 or matrix.shape[1] != self.dim or len(ids) != matrix.shape[0]:
+            raise ValueError(f"Expected {len(ids)} x {self.dim} matrix, got {matrix.shape}")
+        with self._lock:
+            self._matrix = matrix
+            self._ids = np.empty(len(ids), dtype=object)
+            self._ids[:] = list(ids)
+            self._positions = {user_id: position for position, user_id in enumerate(ids)}
+            self._size = len(ids)
+
+    def get(self, user_id):
+        with self._lock:
+            position = self._positions.get(user_id)
+            if position is None:
+                return None
+            return self._matrix[position].copy()
+
+    def add(self, user_id, encoding):
+        """Insert or replace a single encoding without rebuilding the matrix"""
+        encoding = np.asarray(encoding, dtype=self._matrix.dtype).reshape(self.dim)
+        with self._lock:
+            self._ensure_writable()
+            position = self._positions.get(user_id)
+            if position is None:
+                if self._size == self._matrix.shape[0]:
+                    self._grow(self._size + 1)
+                position = self._size
+                self._ids[position] = user_id
+                self._positions[user_id] = position
+                self._size += 1
+            self._matrix[position] = encoding
+
+    def remove(self, user_id):
+        with self._lock:
+            position = self._positions.pop(user_id, None)
+            if position is None:
+                return False
+            self._ensure_writable()
+            last = self._size - 1
+            if position != last:
+                moved_id = self._ids[last]
+                self._matrix[position] = self._matrix[last]
+                self._ids[position] = moved_id
+                self._positions[moved_id] = position
+            self._ids[last] = None
+            self._size = last
+            return True
+
+    def rebuild(self, encodings):
+        """Replace the whole index from a {user_id: encoding} mapping"""
+        with self._lock:
+            self._size = 0
+            self._positions = {}
+            self._ensure_writable()
+            if len(encodings) > self._matrix.shape[0]:
+                self._grow(len(encodings))
+            for user_id, encoding in encodings.items():
+                self.add(user_id, encoding)
+
+    def distances(self, encoding):
+        """Euclidean distance from one encoding to every enrolled encoding"""
+        encoding = np.asarray(encoding, dtype=self._matrix.dtype).reshape(self.dim)
+        with self._lock:
+            ids = self._ids[:self._size].copy()
+            matrix = self._matrix[:self._size]
+            diff = matrix - encoding
+            distances = np.sqrt(np.einsum('ij,ij->i', diff, diff))
+        return ids, distances
+
+    def query(self, encoding, k=1, tolerance=None):
+        """
+        Return the k nearest enrolled users as (user_id, distance) pairs,
+        closest first. Matches farther than tolerance are dropped.
+        """
+        if self._size == 0 or k <= 0:
+            return []
+        ids, distances = self.distances(encoding)
+        k = min(k, len(distances))
+        if k < len(distances):
+            nearest = np.argpartition(distances, k - 1)[:k]
+            nearest = nearest[np.argsort(distances[nearest])]
+        else:
+            nearest = np.argsort(distances)
+        matches = []
+        for position in nearest:
+            distance = float(distances[position])
+            if tolerance is not None and distance > tolerance:
+                break
+            matches.append((ids[position], distance))
+        return matches
@@ -0,0 +1,313 @@
+import os
+import json
+import struct
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+import numpy as np
+from config import FACE_DATABASE_PATH
+from modules.face_index import FaceIndex
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+EMBEDDINGS_FILE = 'embeddings.bin'
+METADATA_FILE = 'embeddings_meta.jsonl'
+LEGACY_DATABASE_FILE = 'face_db.json'
+MIGRATION_LOCK_FILE = '.migrate.lock'
+
+# magic, format version, embedding dimension, committed row count
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 64
+MAGIC = b'JFACEDB1'
+FORMAT_VERSION = 1
+COUNT_OFFSET = 16
+
+def _file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+class PackedEmbeddingFile:
+    """
+    Single-file store of fixed-width float32 embeddings plus an append-only
+    JSONL metadata sidecar.
+
+    embeddings.bin is a 64 byte header followed by `count` rows of `dim`
+    float32 values. Each metadata line records the row it describes. An
+    enrollment writes its row, then its metadata line, and only then bumps
+    the header count, so a row exists for readers only once fully written.
+    """
+    def __init__(self, db_path, dim=128):
+        self.path = os.path.join(db_path, EMBEDDINGS_FILE)
+        self.meta_path = os.path.join(db_path, METADATA_FILE)
+        self.dim = dim
+        self.row_size = dim * np.dtype(np.float32).itemsize
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def create(self, records=(), embeddings=None):
+        """Atomically write a fresh file pair, optionally pre-populated"""
+        count = len(records)
+        directory = os.path.dirname(self.path)
+        meta_fd, tmp_meta_path = tempfile.mkstemp(dir=directory, prefix='.meta.', suffix='.tmp')
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.embeddings.', suffix='.tmp')
+        try:
+            with os.fdopen(meta_fd, 'w') as f:
+                for row, record in enumerate(records):
+                    f.write(json.dumps(dict(record, row=row)) + '\n')
+                _fsync(f)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, FORMAT_VERSION, self.dim, count).ljust(HEADER_SIZE, b'\0'))
+                if count:
+                    f.write(np.ascontiguousarray(embeddings, dtype=np.float32).reshape(count, self.dim).tobytes())
+                _fsync(f)
+            os.replace(tmp_meta_path, self.meta_path)
+            os.replace(tmp_path, self.path)
+        finally:
+            for path in (tmp_meta_path, tmp_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def read_header(self):
+        with open(self.path, 'rb') as f:
+            magic, version, dim, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Unrecognised embeddings file {self.path}")
+        if dim != self.dim:
+            raise ValueError(f"Embeddings file has dimension {dim}, expected {self.dim}")
+        return count
+
+    def rows(self, count):
+        """Zero-copy read-only view of the first `count` rows"""
+        if count == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+        return np.memmap(self.path, dtype=np.float32, mode='r', offset=HEADER_SIZE, shape=(count, self.dim))
+
+    def read_metadata(self, offset=0):
+        """Return (records, end_offset) for complete lines at or after offset"""
+        if not os.path.exists(self.meta_path):
+            return [], 0
+        records = []
+        with open(self.meta_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                records.append((offset, json.loads(line)))
+                offset += len(line)
+        return records, offset
+
+    def append(self, record, embedding):
+        """Append one embedding and its metadata; returns the committed row"""
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(self.dim)
+        with open(self.path, 'r+b') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                row = self.read_header()
+                f.seek(HEADER_SIZE + row * self.row_size)
+                f.write(embedding.tobytes())
+                _fsync(f)
+                with open(self.meta_path, 'ab+') as meta:
+                    # Drop a torn trailing line left behind by an interrupted append
+                    meta.seek(0, os.SEEK_END)
+                    if meta.tell():
+                        meta.seek(-1, os.SEEK_END)
+                        if meta.read(1) != b'\n':
+                            meta.seek(0)
+                            content = meta.read()
+                            meta.truncate(content.rfind(b'\n') + 1)
+                    meta.write((json.dumps(dict(record, row=row)) + '\n').encode('utf-8'))
+                    _fsync(meta)
+                f.seek(COUNT_OFFSET)
+                f.write(struct.pack('<Q', row + 1))
+                _fsync(f)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return row
+
+@contextmanager
+def _migration_lock(db_path):
+    """Exclusive across processes, so only one of them creates the packed files"""
+    with open(os.path.join(db_path, MIGRATION_LOCK_FILE), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        yield
+
+def migrate_legacy_database(db_path, packed):
+    """
+    One-shot conversion of face_db.json + <user_id>.npy into the packed format
+
+    Returns:
+        int: Users migrated, or None if another process had already created the packed files
+    """
+    with _migration_lock(db_path):
+        if packed.exists():
+            return None
+        return _migrate_locked(db_path, packed)
+
+def _migrate_locked(db_path, packed):
+    db_file = os.path.join(db_path, LEGACY_DATABASE_FILE)
+    records = []
+    embeddings = []
+    if os.path.exists(db_file):
+        with open(db_file, 'r') as f:
+            user_data = json.load(f)
+        for user_id, data in user_data.items():
+            encoding_file = os.path.join(db_path, f"{user_id}.npy")
+            if not os.path.exists(encoding_file):
+                logger.warning(f"No encoding found for user {user_id}, skipping migration")
+                continue
+            records.append({'user_id': user_id, 'name': data['name'], 'role': data['role']})
+            embeddings.append(np.load(encoding_file))
+    packed.create(records, np.array(embeddings) if embeddings else None)
+    logger.info(f"Migrated {len(records)} face encodings to {packed.path}")
+    return len(records)
+
+class FaceStore:
+    """
+    Process-wide cache of the enrolled face database.
+
+    The packed embeddings file is stat'ed on each access; when it changes,
+    only rows committed since the last look are read, and a cold start maps
+    the embedding block instead of loading one file per user.
+    """
+    def __init__(self, db_path=FACE_DATABASE_PATH):
+        self.db_path = db_path
+        self.packed = PackedEmbeddingFile(db_path)
+        self.index = FaceIndex()
+        self.users = {}
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._signature = None
+        self._count = 0
+        self._meta_offset = 0
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.entries_reloaded = 0
+
+    def refresh(self):
+        """Bring the cache up to date with disk, touching only what changed"""
+        signature = _file_signature(self.packed.path)
+        with self._lock:
+            if self._loaded and signature == self._signature:
+                self.hits += 1
+                return False
+            self.misses += 1
+            try:
+                self._sync()
+            except Exception as e:
+                logger.error(f"Error loading face database: {str(e)}")
+                return False
+            self.reloads += 1
+            return True
+
+    def _sync(self):
+        if not self.packed.exists():
+            migrate_legacy_database(self.db_path, self.packed)
+        signature = _file_signature(self.packed.path)
+        count = self.packed.read_header()
+        if not self._loaded or count < self._count:
+            self._load_all(count)
+        elif count > self._count:
+            self._load_new(count)
+        self._signature = signature
+        self._loaded = True
+        self.generation += 1
+
+    def _committed_records(self, count, offset):
+        # Lines for rows >= count belong to an append that has not committed
+        # yet; when a row was written more than once the last line wins
+        records, end = self.packed.read_metadata(offset)
+        by_row = {}
+        for line_offset, record in records:
+            if record['row'] >= count:
+                end = line_offset
+                break
+            by_row[record['row']] = record
+        return [by_row[row] for row in sorted(by_row)], end
+
+    def _load_all(self, count):
+        records, self._meta_offset = self._committed_records(count, 0)
+        by_user = {}
+        for record in records:
+            by_user.pop(record['user_id'], None)
+            by_user[record['user_id']] = record
+        ordered = sorted(by_user.values(), key=lambda record: record['row'])
+        matrix = self.packed.rows(count)
+        positions = [record['row'] for record in ordered]
+        if positions != list(range(count)):
+            matrix = np.asarray(matrix[positions]) if positions else matrix[:0]
+        self.index.adopt([record['user_id'] for record in ordered], matrix)
+        self.users = {
+            record['user_id']: {'name': record['name'], 'role': record['role']}
+            for record in ordered
+        }
+        self._count = count
+        self.entries_reloaded += len(ordered)
+        logger.info(f"Face database loaded: {len(self.users)} users")
+
+    def _load_new(self, count):
+        records, self._meta_offset = self._committed_records(count, self._meta_offset)
+        matrix = self.packed.rows(count)
+        for record in records:
+            self.index.add(record['user_id'], matrix[record['row']])
+            self.users[record['user_id']] = {'name': record['name'], 'role': record['role']}
+        self._count = count
+        self.entries_reloaded += len(records)
+
+    def get_user(self, user_id):
+        self.refresh()
+        return self.users.get(user_id)
+
+    def get_database(self):
+        """Return {user_id: {'name', 'role', 'encoding'}} from the cache"""
+        self.refresh()
+        with self._lock:
+            return {
+                user_id: dict(data, encoding=self.index.get(user_id))
+                for user_id, data in self.users.items()
+            }
+
+    def enroll(self, user_id, name, role, encoding):
+        """Append one new user to the packed store and pick it up incrementally"""
+        with self._lock:
+            self.refresh()
+            if user_id in self.users:
+                return False
+            self.packed.append({
+                'user_id': user_id,
+                'name': name,
+                'role': role,
+                'enrolled_at': datetime.now().isoformat()
+            }, encoding)
+            self._sync()
+            return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "users": len(self.users),
+                "generation": self.generation,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "entries_reloaded": self.entries_reloaded
+            }
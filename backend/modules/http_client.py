@@ -0,0 +1,175 @@
+import time
+import random
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES, HTTP_RETRY_BACKOFF,
+    CIRCUIT_BREAKER_FAILURES, CIRCUIT_BREAKER_RESET_SECONDS
+)
+from utils import metrics
+
+logger = logging.getLogger("JARVIS.HTTPClient")
+
+# Upstream responses worth retrying; other statuses are returned to the caller as-is
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream the circuit breaker considers unhealthy"""
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for
+    reset_timeout seconds, then lets a single trial call through (half-open);
+    its outcome closes the circuit again or re-opens it.
+    """
+    def __init__(self, failure_threshold=CIRCUIT_BREAKER_FAILURES, reset_timeout=CIRCUIT_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejections = 0
+        self.trips = 0
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half-open"
+                return True
+            self.rejections += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half-open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                    logger.warning(f"Circuit opened after {self.failures} consecutive failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "trips": self.trips,
+                "rejections": self.rejections
+            }
+
+class HTTPClient:
+    """
+    Shared keep-alive session for outbound model calls with connection
+    pooling, connect/read timeouts, bounded retries with jittered
+    exponential backoff, and a circuit breaker.
+    """
+    def __init__(self, pool_size=HTTP_POOL_SIZE, connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 max_retries=HTTP_MAX_RETRIES, backoff=HTTP_RETRY_BACKOFF, breaker=None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _sleep_before_retry(self, attempt):
+        # Full jitter keeps concurrent retries from hitting the upstream in lockstep
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+        with self._lock:
+            self.retries += 1
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through the pooled session
+
+        Returns:
+            requests.Response: The final response, which may still be an error status
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            requests.RequestException: If every attempt failed to get a response
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit open for outbound calls, not calling {url}")
+        kwargs.setdefault("timeout", self.timeout)
+        with self._lock:
+            self.requests += 1
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                logger.warning(f"Attempt {attempt + 1} to {url} failed: {str(e)}")
+                if attempt == self.max_retries:
+                    self.record_failure()
+                    raise
+                self._sleep_before_retry(attempt)
+                continue
+            except Exception:
+                # Not worth retrying (invalid URL, broken body, ...), but it must
+                # still count, or a half-open trial would never settle
+                self.record_failure()
+                raise
+            if response.status_code in RETRY_STATUSES:
+                if attempt < self.max_retries:
+                    logger.warning(f"Attempt {attempt + 1} to {url} returned {response.status_code}, retrying")
+                    response.close()
+                    self._sleep_before_retry(attempt)
+                    continue
+                self.record_failure()
+            else:
+                self.breaker.record_success()
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def record_failure(self):
+        """Count a failed call, e.g. a streamed body that broke off after the response started"""
+        self.breaker.record_failure()
+        with self._lock:
+            self.failures += 1
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "requests": self.requests,
+                "retries": self.retries,
+                "failures": self.failures,
+                "connect_timeout_s": self.timeout[0],
+                "read_timeout_s": self.timeout[1]
+            }
+        stats["circuit"] = self.breaker.stats()
+        return stats
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_http_client():
+    """Return the process-wide HTTP client for outbound model calls"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HTTPClient()
+                metrics.register('http_client', _client.stats)
+    return _client
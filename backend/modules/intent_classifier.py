@@ -6,9 +6,168 @@ import json
 import logging
 import re
 import string
+import threading
+from collections import OrderedDict
+from typing import Optional
+from utils.model_loading import load_model
 
 logger = logging.getLogger("JARVIS.IntentClassifier")
 
+MAX_SEQUENCE_LENGTH = 20
+# Model predictions at or below this softmax confidence fall back to the keyword rules
+CONFIDENCE_THRESHOLD = 0.7
+
+# Keyword rules used when the model is unsure, in priority order
+INTENT_RULES = {
+    r"weather|forecast|temperature outside|rain|sunny": "weather",
+    r"time|clock|hour|minute": "time",
+    r"remind|reminder|remember|forget": "reminder",
+    r"alarm|wake|alert": "alarm",
+    r"music|song|play|spotify|artist": "music",
+    r"light|lamp|bright|dark": "lights",
+    r"thermostat|heat|cool|ac|temperature inside": "temperature",
+    r"news|headline|report": "news",
+    r"joke|funny|laugh": "joke",
+    r"calendar|schedule|meeting|appointment": "calendar",
+    r"email|mail|gmail|outlook|message": "email",
+    r"search|find|google|look up": "search",
+    r"navigate|direction|map|route|go to": "navigation",
+    r"call|phone|dial|ring": "call",
+    r"text|sms|message|whatsapp": "message"
+}
+
+class IntentRuleMatcher:
+    """
+    Compiles keyword rules (alternations of literal keywords, highest
+    priority first) into one trie-shaped regex so each text is scanned once
+    instead of once per rule.
+
+    At each match position the regex reports the longest keyword found
+    there; every other keyword matching at that position is a prefix of it,
+    so each keyword is mapped to the best rule among its keyword prefixes.
+    Scanning resumes one character after each match start, so overlapping
+    keywords are not skipped and the result equals the ordered per-rule
+    search.
+    """
+    def __init__(self, rules, default="general_question"):
+        self.intents = list(rules.values())
+        self.default = default
+        keyword_rules = {}
+        for index, pattern in enumerate(rules):
+            for keyword in pattern.split("|"):
+                keyword_rules.setdefault(keyword, index)
+        self.keyword_rules = {
+            keyword: min(index for prefix, index in keyword_rules.items() if keyword.startswith(prefix))
+            for keyword in keyword_rules
+        }
+        self.pattern = re.compile(self._trie_pattern(keyword_rules))
+
+    @staticmethod
+    def _trie_pattern(keywords):
+        trie = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = True
+
+        def build(node):
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ""
+            body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+            # A keyword ending here makes the rest optional; greedy matching still prefers the longest
+            return "(?:" + body + ")?" if "" in node else body
+
+        return build(trie)
+
+    def classify(self, text):
+        text = text.lower()
+        best = len(self.intents)
+        position = 0
+        while best > 0:
+            match = self.pattern.search(text, position)
+            if match is None:
+                break
+            best = min(best, self.keyword_rules[match.group()])
+            position = match.start() + 1
+        return self.intents[best] if best < len(self.intents) else self.default
+
+class IntentTokenizer:
+    """
+    Maps utterances to vocabulary index tensors. The punctuation table is
+    built once per class, token lookups run through a single map() call,
+    index lists become tensors through one NumPy array, and single-utterance
+    tensors are kept in an LRU keyed on the normalised text so repeated
+    commands skip tokenization entirely.
+    """
+    PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+    def __init__(self, vocab, device, max_length=MAX_SEQUENCE_LENGTH, cache_size=1024):
+        self.vocab = vocab
+        self.device = device
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self.pad_index = vocab["<PAD>"]
+        self.unk_index = vocab["<UNK>"]
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def normalize(self, text):
+        return text.lower().translate(self.PUNCTUATION_TABLE)
+
+    def _lookup(self, tokens):
+        tokens = tokens[:self.max_length]
+        return list(map(self.vocab.get, tokens, [self.unk_index] * len(tokens)))
+
+    def indices(self, text):
+        """Unpadded vocabulary indices for text, truncated to max_length"""
+        return self._lookup(self.normalize(text).split())
+
+    def encode(self, text):
+        """
+        (1, length) index tensor on the tokenizer's device, served from the LRU
+        when possible. Like encode_batch it carries no padding steps, so the
+        LSTM sees the same sequence either way and classify agrees with
+        classify_batch.
+        """
+        key = self.normalize(text)
+        with self._lock:
+            tensor = self._cache.get(key)
+            if tensor is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return tensor
+            self.misses += 1
+        # Empty texts keep a single <PAD> step, as in encode_batch
+        indices = self._lookup(key.split()) or [self.pad_index]
+        tensor = torch.from_numpy(np.array([indices], dtype=np.int64)).to(self.device)
+        if self.cache_size:
+            with self._lock:
+                self._cache[key] = tensor
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return tensor
+
+    def encode_batch(self, texts):
+        """Index tensor padded to the longest text in the batch, plus each text's length"""
+        sequences = [self.indices(text) for text in texts]
+        # Empty texts keep a single <PAD> step; packed sequences must not be empty
+        lengths = [max(len(indices), 1) for indices in sequences]
+        width = max(lengths)
+        padded = [indices + [self.pad_index] * (width - len(indices)) for indices in sequences]
+        return torch.from_numpy(np.array(padded, dtype=np.int64)).to(self.device), torch.LongTensor(lengths)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
 class LSTMClassifier(nn.Module):
     def __init__(self, vocab_size, embedding_dim, hidden_dim, output_dim, n_layers=1, dropout=0.5):
         super(LSTMClassifier, self).__init__()
@@ -17,9 +176,14 @@ class LSTMClassifier(nn.Module):
         self.fc = nn.Linear(hidden_dim, output_dim)
         self.dropout = nn.Dropout(dropout)
 
-    def forward(self, text):
+    def forward(self, text, lengths: Optional[torch.Tensor] = None):
         embedded = self.embedding(text)
-        output, (hidden, cell) = self.lstm(embedded)
+        if lengths is not None:
+            # Packing stops each sequence at its real length, so padding is never run through the LSTM
+            packed = nn.utils.rnn.pack_padded_sequence(embedded, lengths.cpu(), batch_first=True, enforce_sorted=False)
+            _, (hidden, _) = self.lstm(packed)
+        else:
+            _, (hidden, _) = self.lstm(embedded)
         hidden = self.dropout(hidden[-1])
         return self.fc(hidden)
 
@@ -49,59 +213,26 @@ class IntentClassifier:
                 self.vocab[word] = len(self.vocab)
             with open(vocab_path, 'w') as f:
                 json.dump(self.vocab, f)
-        self.model = LSTMClassifier(
+        self.model = load_model(
+            LSTMClassifier, model_path, self.device,
             vocab_size=len(self.vocab),
             embedding_dim=100,
             hidden_dim=128,
             output_dim=len(self.intents),
             n_layers=2
-        ).to(self.device)
-        if os.path.exists(model_path):
-            logger.info(f"Loading intent classifier model from {model_path}")
-            self.model.load_state_dict(torch.load(model_path, map_location=self.device))
-        else:
-            logger.warning(f"Model not found at {model_path}, using untrained model")
-        self.model.eval()
-        self.rules = {
-            r"weather|forecast|temperature outside|rain|sunny": "weather",
-            r"time|clock|hour|minute": "time",
-            r"remind|reminder|remember|forget": "reminder",
-            r"alarm|wake|alert": "alarm",
-            r"music|song|play|spotify|artist": "music",
-            r"light|lamp|bright|dark": "lights",
-            r"thermostat|heat|cool|ac|temperature inside": "temperature",
-            r"news|headline|report": "news",
-            r"joke|funny|laugh": "joke",
-            r"calendar|schedule|meeting|appointment": "calendar",
-            r"email|mail|gmail|outlook|message": "email",
-            r"search|find|google|look up": "search",
-            r"navigate|direction|map|route|go to": "navigation",
-            r"call|phone|dial|ring": "call",
-            r"text|sms|message|whatsapp": "message"
-        }
+        )
+        self.rules = INTENT_RULES
+        self.rule_matcher = IntentRuleMatcher(self.rules)
+        self.tokenizer = IntentTokenizer(self.vocab, self.device)
 
     def _preprocess_text(self, text):
-        text = text.lower()
-        text = text.translate(str.maketrans('', '', string.punctuation))
-        tokens = text.split()
-        indices = []
-        for token in tokens:
-            if token in self.vocab:
-                indices.append(self.vocab[token])
-            else:
-                indices.append(self.vocab["<UNK>"])
-        if len(indices) < 20:
-            indices = indices + [self.vocab["<PAD>"]] * (20 - len(indices))
-        else:
-            indices = indices[:20]
-        return torch.LongTensor(indices).unsqueeze(0).to(self.device)
+        return self.tokenizer.encode(text)
+
+    def _preprocess_batch(self, texts):
+        return self.tokenizer.encode_batch(texts)
 
     def _rule_based_classify(self, text):
-        text = text.lower()
-        for pattern, intent in self.rules.items():
-            if re.search(pattern, text):
-                return intent
-        return "general_question"
+        return self.rule_matcher.classify(text)
 
     def classify(self, text):
         try:
@@ -111,7 +242,7 @@ class IntentClassifier:
                 _, predicted = torch.max(output, 1)
                 intent = self.intents[predicted.item()]
                 confidence = torch.softmax(output, 1).max().item()
-                if confidence > 0.7:
+                if confidence > CONFIDENCE_THRESHOLD:
                     logger.info(f"Classified intent: {intent} (confidence: {confidence:.2f})")
                     return intent
         except Exception as e:
@@ -119,3 +250,34 @@ class IntentClassifier:
         intent = self._rule_based_classify(text)
         logger.info(f"Classified intent (rule-based): {intent}")
         return intent
+
+    def classify_batch(self, texts, batch_size=64):
+        """
+        Classify many texts with one padded, packed forward pass per batch
+
+        Args:
+            texts (list): Utterances to classify
+            batch_size (int): Most texts per forward pass
+
+        Returns:
+            list: (intent, confidence) per text, in input order. confidence is
+            the model's; texts it is not confident about get the rule-based intent.
+        """
+        results = []
+        for start in range(0, len(texts), batch_size):
+            chunk = texts[start:start + batch_size]
+            try:
+                batch, lengths = self._preprocess_batch(chunk)
+                with torch.no_grad():
+                    probabilities = torch.softmax(self.model(batch, lengths), 1)
+                    confidences, predicted = probabilities.max(1)
+                predictions = zip(predicted.tolist(), confidences.tolist())
+            except Exception as e:
+                logger.error(f"Error in batched model-based intent classification: {str(e)}")
+                predictions = [(None, 0.0)] * len(chunk)
+            for text, (index, confidence) in zip(chunk, predictions):
+                if index is not None and confidence > CONFIDENCE_THRESHOLD:
+                    results.append((self.intents[index], confidence))
+                else:
+                    results.append((self._rule_based_classify(text), confidence))
+        return results
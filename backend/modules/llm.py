@@ -0,0 +1,183 @@
+import json
+import time
+import logging
+import threading
+import requests
+from config import (
+    GEMINI_API_KEY, GEMINI_MODEL, GEMINI_API_BASE_URL, LLM_BACKEND, FAKE_LLM_FIRST_TOKEN_DELAY_MS, FAKE_LLM_TOKEN_DELAY_MS
+)
+from modules.http_client import get_http_client
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+class LLMBackend:
+    """
+    Interface for text generation backends.
+
+    history is a list of {'role': 'user'|'model', 'parts': [text]} turns
+    preceding prompt, or None for a single-shot generation.
+    """
+    name = "base"
+
+    def stream(self, prompt, history=None):
+        """Yield the reply as text chunks as soon as the model produces them"""
+        raise NotImplementedError
+
+    def generate(self, prompt, history=None):
+        """Return the whole reply as one string"""
+        return "".join(self.stream(prompt, history))
+
+class LLMError(RuntimeError):
+    """Raised when the model API answers with an error"""
+
+def _candidate_text(payload):
+    candidates = payload.get("candidates") or []
+    if not candidates:
+        return ""
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts)
+
+class GeminiBackend(LLMBackend):
+    """
+    Gemini over its REST API, sent through the shared HTTP client so every
+    call gets its connect/read timeouts, retries and circuit breaker
+    """
+    name = "gemini"
+
+    def __init__(self, model_name=GEMINI_MODEL, api_key=GEMINI_API_KEY):
+        self.model_name = model_name
+        self.api_key = api_key
+
+    def _post(self, method, prompt, history, **kwargs):
+        contents = [
+            {"role": turn["role"], "parts": [part if isinstance(part, dict) else {"text": part} for part in turn["parts"]]}
+            for turn in history or []
+        ]
+        contents.append({"role": "user", "parts": [{"text": prompt}]})
+        url = f"{GEMINI_API_BASE_URL}/v1beta/models/{self.model_name}:{method}"
+        headers = {"x-goog-api-key": self.api_key or ""}
+        response = get_http_client().post(url, headers=headers, json={"contents": contents}, **kwargs)
+        if response.status_code != 200:
+            try:
+                message = response.json().get("error", {}).get("message", "Unknown error")
+            except ValueError:
+                message = response.reason
+            response.close()
+            raise LLMError(f"Gemini API returned {response.status_code}: {message}")
+        return response
+
+    def stream(self, prompt, history=None):
+        response = self._post("streamGenerateContent", prompt, history, params={"alt": "sse"}, stream=True)
+        with response:
+            try:
+                for line in response.iter_lines():
+                    if not line.startswith(b"data:"):
+                        continue
+                    text = _candidate_text(json.loads(line[len(b"data:"):]))
+                    if text:
+                        yield text
+            except requests.RequestException:
+                get_http_client().record_failure()
+                raise
+
+    def generate(self, prompt, history=None):
+        with self._post("generateContent", prompt, history) as response:
+            return _candidate_text(response.json())
+
+class FakeLLMBackend(LLMBackend):
+    """Local stand-in that streams a canned or echoed reply word by word"""
+    name = "fake"
+
+    def __init__(self, reply=None, first_token_delay=FAKE_LLM_FIRST_TOKEN_DELAY_MS / 1000, token_delay=FAKE_LLM_TOKEN_DELAY_MS / 1000):
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+
+    def stream(self, prompt, history=None):
+        reply = self.reply if self.reply is not None else f"You said: {prompt}"
+        time.sleep(self.first_token_delay)
+        words = reply.split(' ')
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(self.token_delay)
+            yield word if i == len(words) - 1 else word + ' '
+
+BACKENDS = {
+    GeminiBackend.name: GeminiBackend,
+    FakeLLMBackend.name: FakeLLMBackend
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_llm_backend():
+    """Return the process-wide backend selected by config.LLM_BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = BACKENDS[LLM_BACKEND]()
+                logger.info(f"Using {_backend.name} LLM backend")
+    return _backend
+
+def set_llm_backend(backend):
+    """Swap the process-wide backend, e.g. for a FakeLLMBackend in tests"""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+class StreamStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.streams = 0
+        self.errors = 0
+        self.total_ttft_ms = 0.0
+        self.last_ttft_ms = 0.0
+        self.total_stream_ms = 0.0
+
+    def record(self, ttft_ms, total_ms, error=False):
+        with self._lock:
+            self.streams += 1
+            self.errors += int(error)
+            if ttft_ms is not None:
+                self.total_ttft_ms += ttft_ms
+                self.last_ttft_ms = ttft_ms
+            self.total_stream_ms += total_ms
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": _backend.name if _backend is not None else LLM_BACKEND,
+                "streams": self.streams,
+                "errors": self.errors,
+                "avg_ttft_ms": self.total_ttft_ms / self.streams if self.streams else 0.0,
+                "last_ttft_ms": self.last_ttft_ms,
+                "avg_stream_ms": self.total_stream_ms / self.streams if self.streams else 0.0
+            }
+
+stream_stats = StreamStats()
+metrics.register('llm', stream_stats.stats)
+
+def timed_stream(chunks):
+    """
+    Pass chunks through while recording time-to-first-token and total time
+
+    Yields:
+        tuple: (chunk, ttft_ms) where ttft_ms is set on the first chunk only
+    """
+    started = time.perf_counter()
+    ttft_ms = None
+    error = False
+    try:
+        for chunk in chunks:
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - started) * 1000
+                yield chunk, ttft_ms
+            else:
+                yield chunk, None
+    except Exception:
+        error = True
+        raise
+    finally:
+        stream_stats.record(ttft_ms, (time.perf_counter() - started) * 1000, error)
@@ -0,0 +1,224 @@
+import gc
+import os
+import time
+import logging
+import threading
+from config import OBJECT_DETECTION_MODEL, MODEL_IDLE_TTL_SECONDS
+from modules.asr import asr_engine
+from utils import metrics
+from utils.executors import configure_torch_threads
+
+logger = logging.getLogger("JARVIS.ModelRegistry")
+
+# A model that failed to load is not retried for this long, so a missing
+# dependency doesn't make every request pay for another load attempt
+FAILED_LOAD_RETRY_SECONDS = 60
+
+class ModelLoadError(RuntimeError):
+    """Raised by ModelRegistry.get when a model could not be loaded"""
+
+def _resident_bytes():
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss
+    except Exception:
+        return None
+
+def _parameter_bytes(instance):
+    """Size of the torch parameters and buffers held by a model or its .model attribute"""
+    try:
+        import torch.nn as nn
+    except ImportError:
+        return None
+    module = instance if isinstance(instance, nn.Module) else getattr(instance, "model", None)
+    if not isinstance(module, nn.Module):
+        return None
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+class ModelRegistry:
+    """
+    Process-wide home for heavyweight models.
+
+    Each model is registered with a zero-argument factory and is only
+    built on its first get(); every caller then shares that one instance.
+    Models idle for longer than their TTL are dropped by a background
+    thread and transparently rebuilt on the next get().
+    """
+    def __init__(self, idle_ttl=MODEL_IDLE_TTL_SECONDS):
+        self.idle_ttl = idle_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, factory, unload=None, idle_ttl=None):
+        """
+        Register a model factory
+
+        Args:
+            name: Key callers use with get()
+            factory: Zero-argument callable building the model
+            unload: Optional callable given the instance when it is unloaded
+            idle_ttl: Seconds of disuse before unloading; None uses the registry default, 0 never unloads
+        """
+        with self._lock:
+            self._entries[name] = {
+                "factory": factory,
+                "unload": unload,
+                "idle_ttl": self.idle_ttl if idle_ttl is None else idle_ttl,
+                "lock": threading.Lock(),
+                "instance": None,
+                "loaded_at": None,
+                "last_used": None,
+                "load_time_s": None,
+                "rss_delta_bytes": None,
+                "parameter_bytes": None,
+                "loads": 0,
+                "failed_at": None,
+                "error": None
+            }
+
+    def _entry(self, name):
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            raise KeyError(f"No model registered as '{name}'")
+        return entry
+
+    def get(self, name):
+        """
+        Return the shared instance, building it on first use
+
+        Raises:
+            ModelLoadError: If the factory failed, now or within FAILED_LOAD_RETRY_SECONDS
+        """
+        entry = self._entry(name)
+        instance = entry["instance"]
+        if instance is None:
+            with entry["lock"]:
+                instance = entry["instance"]
+                if instance is None:
+                    instance = self._load(name, entry)
+        entry["last_used"] = time.monotonic()
+        return instance
+
+    def _load(self, name, entry):
+        if entry["failed_at"] is not None and time.monotonic() - entry["failed_at"] < FAILED_LOAD_RETRY_SECONDS:
+            raise ModelLoadError(f"Model '{name}' is unavailable: {entry['error']}")
+        configure_torch_threads()
+        rss_before = _resident_bytes()
+        started = time.perf_counter()
+        try:
+            instance = entry["factory"]()
+        except Exception as e:
+            entry["failed_at"] = time.monotonic()
+            entry["error"] = str(e)
+            logger.error(f"Error loading model '{name}': {str(e)}")
+            raise ModelLoadError(f"Model '{name}' is unavailable: {str(e)}") from e
+        entry["load_time_s"] = time.perf_counter() - started
+        rss_after = _resident_bytes()
+        entry["rss_delta_bytes"] = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+        entry["parameter_bytes"] = _parameter_bytes(instance)
+        entry["loaded_at"] = time.time()
+        entry["last_used"] = time.monotonic()
+        entry["loads"] += 1
+        entry["failed_at"] = None
+        entry["error"] = None
+        entry["instance"] = instance
+        logger.info(f"Loaded model '{name}' in {entry['load_time_s']:.2f}s")
+        return instance
+
+    def is_loaded(self, name):
+        return self._entry(name)["instance"] is not None
+
+    def preload(self, *names):
+        """Build the named models now, e.g. before forking workers; failures are logged, not raised"""
+        for name in names:
+            try:
+                self.get(name)
+            except ModelLoadError:
+                pass
+
+    def unload(self, name):
+        """Drop the shared instance; callers still holding it keep a working reference"""
+        entry = self._entry(name)
+        with entry["lock"]:
+            instance = entry["instance"]
+            if instance is None:
+                return False
+            entry["instance"] = None
+            if entry["unload"] is not None:
+                try:
+                    entry["unload"](instance)
+                except Exception as e:
+                    logger.error(f"Error unloading model '{name}': {str(e)}")
+        del instance
+        gc.collect()
+        logger.info(f"Unloaded model '{name}'")
+        return True
+
+    def unload_idle(self):
+        """Unload every model unused for longer than its idle TTL"""
+        now = time.monotonic()
+        with self._lock:
+            names = list(self._entries.items())
+        unloaded = []
+        for name, entry in names:
+            ttl = entry["idle_ttl"]
+            if ttl and entry["instance"] is not None and now - entry["last_used"] > ttl:
+                if self.unload(name):
+                    unloaded.append(name)
+        return unloaded
+
+    def start(self):
+        """Run the idle reaper in a daemon thread if any model has a TTL"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            ttls = [entry["idle_ttl"] for entry in self._entries.values() if entry["idle_ttl"]]
+        if not ttls:
+            return
+        interval = max(1.0, min(ttls) / 4)
+
+        def run():
+            while not self._stop.wait(interval):
+                self.unload_idle()
+
+        self._thread = threading.Thread(target=run, name="model-registry-reaper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.items())
+        report = {}
+        for name, entry in entries:
+            loaded = entry["instance"] is not None
+            report[name] = {
+                "loaded": loaded,
+                "loads": entry["loads"],
+                "load_time_s": entry["load_time_s"],
+                "idle_s": now - entry["last_used"] if loaded and entry["last_used"] is not None else None,
+                "idle_ttl_s": entry["idle_ttl"],
+                "parameter_mb": entry["parameter_bytes"] / (1024 * 1024) if loaded and entry["parameter_bytes"] is not None else None,
+                "rss_delta_mb": entry["rss_delta_bytes"] / (1024 * 1024) if loaded and entry["rss_delta_bytes"] is not None else None,
+                "error": entry["error"]
+            }
+        return report
+
+def _load_yolo():
+    from ultralytics import YOLO
+    return YOLO(OBJECT_DETECTION_MODEL)
+
+def _load_asr():
+    asr_engine.load()
+    return asr_engine
+
+model_registry = ModelRegistry()
+model_registry.register("yolo", _load_yolo)
+model_registry.register("asr", _load_asr, unload=lambda engine: engine.unload())
+metrics.register('models', model_registry.stats)
@@ -0,0 +1,181 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from config import RESPONSE_CACHE_BACKEND, RESPONSE_CACHE_TTL, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_PATH
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_prompt(prompt):
+    """
+    Case- and whitespace-insensitive form of a prompt. Punctuation is kept:
+    "2+2" and "2-2", or "C++" and "C", are different questions.
+    """
+    return _WHITESPACE.sub(" ", prompt.casefold()).strip()
+
+def make_key(prompt, model, generation_config=None):
+    payload = json.dumps({
+        "prompt": normalize_prompt(prompt),
+        "model": model,
+        "config": generation_config or {}
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class MemoryCacheBackend:
+    """In-process LRU with per-entry expiry"""
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteCacheBackend:
+    """
+    On-disk cache shared across processes and restarts, evicting least
+    recently used. Each process opens its own connection on first use: a
+    connection must not cross fork(), e.g. into preloaded gunicorn workers.
+    """
+    def __init__(self, path=RESPONSE_CACHE_PATH, max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn_pid = None
+        self._connection = None
+
+    @property
+    def _conn(self):
+        # Callers hold self._lock
+        if self._conn_pid != os.getpid():
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            self._connection = conn
+            self._conn_pid = os.getpid()
+        return self._connection
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now)
+            )
+            self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (now,))
+            cursor = self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            return max(cursor.rowcount, 0)
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+class ResponseCache:
+    """
+    Caches complete LLM replies for stateless prompts keyed on the
+    normalised prompt, model and generation config. Anything that depends
+    on conversation history must skip the cache; callers report such
+    skips with record_bypass() so they show up in the stats.
+    """
+    def __init__(self, backend, ttl=RESPONSE_CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+
+    def get(self, prompt, model, generation_config=None):
+        value = self.backend.get(make_key(prompt, model, generation_config))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, prompt, model, value, generation_config=None):
+        evicted = self.backend.set(make_key(prompt, model, generation_config), value, self.ttl)
+        with self._lock:
+            self.evictions += evicted
+
+    def record_bypass(self):
+        with self._lock:
+            self.bypasses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "entries": len(self.backend),
+                "ttl_s": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+def create_response_cache():
+    """Build the cache selected by config.RESPONSE_CACHE_BACKEND, or None if disabled"""
+    if RESPONSE_CACHE_BACKEND == 'none':
+        return None
+    if RESPONSE_CACHE_BACKEND == 'sqlite':
+        backend = SQLiteCacheBackend()
+    else:
+        backend = MemoryCacheBackend()
+    cache = ResponseCache(backend)
+    metrics.register('response_cache', cache.stats)
+    return cache
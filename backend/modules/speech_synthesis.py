@@ -1,99 +1,519 @@
+import io
 import os
+import re
+import json
+import time
+import wave
+import queue
+import struct
+import shutil
+import hashlib
 import logging
 import tempfile
-import numpy as np
-from io import BytesIO
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager
+from config import TTS_ENGINE, TTS_ENGINE_POOL_SIZE, TTS_CACHE_PATH, TTS_CACHE_MAX_BYTES
+from utils import metrics
+from utils.executors import io_executor
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 logger = logging.getLogger("JARVIS.SpeechSynthesis")
 
-class SpeechSynthesizer:
+# Longest a single local synthesis may take before the request gives up on it
+ENGINE_TIMEOUT_SECONDS = 30
+
+# Fixed phrases the assistant speaks often enough to synthesize ahead of time
+COMMON_REPLIES = [
+    # Chatbot fallbacks
+    "Hello! How can I assist you today?",
+    "Hi there! I'm JARVIS, your AI assistant. What can I do for you?",
+    "Greetings! How may I help you?",
+    "Goodbye! Have a great day!",
+    "See you later! Feel free to ask if you need anything else.",
+    "I'm not sure I understand. Could you please rephrase that?",
+    "I'm still learning. Could you try asking in a different way?",
+    # Voice command errors
+    "I didn't hear anything. Please try speaking again.",
+    "I couldn't process that audio format. Please try a different format.",
+    "I encountered an error while processing your voice command. Please try again."
+]
+
+AUDIO_MIMETYPES = {
+    "mp3": "audio/mpeg",
+    "wav": "audio/wav"
+}
+
+# A sentence ends at ., ! or ? followed by whitespace (so "3.5" is not split), or at a newline
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n+')
+
+class SentenceSplitter:
+    """Cut streamed text into complete sentences as soon as each one ends"""
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, text):
+        """Add a chunk and return the sentences it completed"""
+        self.buffer += text
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            # The whitespace may continue in the next chunk; only cut once more text follows it
+            if match.end() == len(self.buffer):
+                break
+            sentence = self.buffer[start:match.start()].strip()
+            if sentence:
+                sentences.append(sentence)
+            start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Return whatever is left once the stream has ended"""
+        sentence = self.buffer.strip()
+        self.buffer = ""
+        return [sentence] if sentence else []
+
+def split_sentences(text):
+    splitter = SentenceSplitter()
+    return splitter.feed(text) + splitter.flush()
+
+class TTSEngine:
+    """
+    Interface for speech synthesis engines. An instance is only ever used
+    by one thread at a time; EnginePool hands them out. Engines whose
+    instances share state (concurrent = False) get a pool of one.
+    """
+    name = "base"
+    format = None
+    concurrent = True
+
+    def synthesize(self, text, voice="default"):
+        """Return the audio for text as bytes in self.format"""
+        raise NotImplementedError
+
+def espeak_binary():
+    return shutil.which("espeak-ng") or shutil.which("espeak")
+
+class EspeakEngine(TTSEngine):
+    """Offline synthesis with the espeak-ng CLI; every call is its own process, so calls can overlap"""
+    name = "espeak"
+    format = "wav"
+
     def __init__(self):
-        # Try to import TTS libraries
-        self.tts_available = False
-        
+        self.binary = espeak_binary()
+        if self.binary is None:
+            raise RuntimeError("espeak-ng is not installed")
+
+    def synthesize(self, text, voice="default"):
+        fd, temp_path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        command = [self.binary, "-w", temp_path, "--stdin"]
+        if voice != "default":
+            command[1:1] = ["-v", voice]
         try:
-            import torch
-            import torchaudio
-            self.torch_available = True
-            logger.info("PyTorch and torchaudio available for TTS")
-        except ImportError:
-            self.torch_available = False
-            logger.warning("PyTorch or torchaudio not available")
-        
-        # Try to import pyttsx3 as fallback
+            subprocess.run(
+                command, input=text.encode('utf-8'), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                check=True, timeout=ENGINE_TIMEOUT_SECONDS
+            )
+            with open(temp_path, 'rb') as f:
+                return f.read()
+        finally:
+            os.unlink(temp_path)
+
+class Pyttsx3Engine(TTSEngine):
+    """
+    Synthesis through pyttsx3's platform driver (SAPI5, NSSS, espeak).
+
+    The drivers are not safe to run concurrently: espeak's library state is
+    process-global and SAPI5's COM objects belong to the thread that created
+    them. So there is only ever one instance, and it is built and driven on
+    a thread of its own.
+    """
+    name = "pyttsx3"
+    format = "wav"
+    concurrent = False
+
+    def __init__(self):
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pyttsx3")
+        self._thread.submit(self._start).result()
+
+    def _start(self):
         try:
-            import pyttsx3
-            self.pyttsx3 = pyttsx3.init()
-            self.pyttsx3_available = True
-            logger.info("Using pyttsx3 as fallback TTS engine")
+            import pythoncom
+            pythoncom.CoInitialize()
         except ImportError:
-            self.pyttsx3_available = False
-            logger.warning("pyttsx3 not available")
-        
-        # Try to import gTTS as another fallback
+            pass
+        import pyttsx3
+        self.engine = pyttsx3.init()
+        self.voices = {v.name.lower(): v.id for v in self.engine.getProperty('voices')}
+        self.default_voice = self.engine.getProperty('voice')
+
+    def _voice_id(self, voice):
+        if voice == "default":
+            return self.default_voice
+        for name, voice_id in self.voices.items():
+            if voice.lower() in name:
+                return voice_id
+        return self.default_voice
+
+    def _synthesize(self, text, voice):
+        self.engine.setProperty('voice', self._voice_id(voice))
+        # The drivers can only render to a file
+        fd, temp_path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
         try:
-            from gtts import gTTS
-            self.gtts_available = True
-            self.gtts = gTTS
-            logger.info("Using gTTS as another fallback TTS engine")
-        except ImportError:
-            self.gtts_available = False
-            logger.warning("gTTS not available")
-    
+            self.engine.save_to_file(text, temp_path)
+            self.engine.runAndWait()
+            with open(temp_path, 'rb') as f:
+                return f.read()
+        finally:
+            os.unlink(temp_path)
+
+    def synthesize(self, text, voice="default"):
+        return self._thread.submit(self._synthesize, text, voice).result(timeout=ENGINE_TIMEOUT_SECONDS)
+
+class GTTSEngine(TTSEngine):
+    """Google Translate TTS; needs network access. voice is a language code"""
+    name = "gtts"
+    format = "mp3"
+
+    def __init__(self):
+        from gtts import gTTS
+        self.gtts = gTTS
+
     def synthesize(self, text, voice="default"):
-        """Synthesize speech from text"""
-        # Try using pyttsx3 if available
-        if self.pyttsx3_available:
+        mp3_fp = io.BytesIO()
+        self.gtts(text=text, lang='en' if voice == "default" else voice).write_to_fp(mp3_fp)
+        return mp3_fp.getvalue()
+
+ENGINES = {
+    EspeakEngine.name: EspeakEngine,
+    Pyttsx3Engine.name: Pyttsx3Engine,
+    GTTSEngine.name: GTTSEngine
+}
+
+def select_engine_class(name=TTS_ENGINE):
+    """Resolve TTS_ENGINE; 'auto' prefers offline engines: espeak-ng, then pyttsx3, then gTTS"""
+    if name != "auto":
+        return ENGINES[name]
+    if espeak_binary() is not None:
+        return EspeakEngine
+    try:
+        import pyttsx3  # noqa: F401
+        return Pyttsx3Engine
+    except ImportError:
+        return GTTSEngine
+
+class EnginePool:
+    """Lend engine instances to one thread at a time, building up to size of them on demand"""
+    def __init__(self, engine_class, size=TTS_ENGINE_POOL_SIZE):
+        self.engine_class = engine_class
+        self.size = max(1, size) if engine_class.concurrent else 1
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def engine(self):
+        try:
+            engine = self._idle.get_nowait()
+        except queue.Empty:
+            engine = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    engine = self.engine_class()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                engine = self._idle.get()
+        try:
+            yield engine
+        finally:
+            self._idle.put(engine)
+
+    def stats(self):
+        return {"engine": self.engine_class.name, "size": self.size, "created": self._created, "idle": self._idle.qsize()}
+
+def cache_key(text, voice, audio_format, engine):
+    """Content address of a clip: the same text, voice, format and engine always sound the same"""
+    payload = json.dumps({
+        "text": " ".join(text.split()),
+        "voice": voice,
+        "format": audio_format,
+        "engine": engine
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class AudioCache:
+    """
+    On-disk store of synthesized clips, evicting least recently used past max_bytes.
+
+    Clips are written under their content address, so processes sharing the
+    directory can read each other's entries. Each write re-reads the
+    directory's sizes and modification times under a lock file before
+    evicting, so the bound holds for the directory as a whole rather than
+    for each process's own writes.
+    """
+    def __init__(self, directory=TTS_CACHE_PATH, max_bytes=TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        self._index.clear()
+        self._bytes = 0
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith('.') or not os.path.isfile(path):
+                continue
             try:
-                # Set voice if specified
-                if voice != "default":
-                    voices = self.pyttsx3.getProperty('voices')
-                    for v in voices:
-                        if voice.lower() in v.name.lower():
-                            self.pyttsx3.setProperty('voice', v.id)
-                            break
-                
-                # Create a temporary file to save the audio
-                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-                    temp_path = temp_file.name
-                
-                # Generate speech
-                self.pyttsx3.save_to_file(text, temp_path)
-                self.pyttsx3.runAndWait()
-                
-                # Read the file
-                with open(temp_path, 'rb') as f:
-                    audio_data = f.read()
-                
-                # Clean up
-                os.unlink(temp_path)
-                
-                logger.info(f"Synthesized speech using pyttsx3: {text[:30]}...")
-                return audio_data
-            
-            except Exception as e:
-                logger.error(f"Error using pyttsx3 for TTS: {str(e)}")
-        
-        # Try using gTTS if available
-        if self.gtts_available:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # Evicted by another process while we listed the directory
+                continue
+            entries.append((stat.st_mtime, name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._index[name] = size
+            self._bytes += size
+
+    def get(self, key, audio_format):
+        """Return the cached clip's path, or None"""
+        name = f"{key}.{audio_format}"
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            with self._lock:
+                self.misses += 1
+                size = self._index.pop(name, None)
+                if size is not None:
+                    self._bytes -= size
+            return None
+        with self._lock:
+            self.hits += 1
+            if name not in self._index:
+                # Written by another process
+                self._index[name] = os.path.getsize(path)
+                self._bytes += self._index[name]
+            self._index.move_to_end(name)
+        try:
+            # Recency survives restarts through the modification time
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def read(self, key, audio_format):
+        path = self.get(key, audio_format)
+        if path is None:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, audio_format, audio):
+        """Store a clip atomically and evict old clips beyond max_bytes"""
+        if not audio or len(audio) > self.max_bytes:
+            return None
+        name = f"{key}.{audio_format}"
+        path = os.path.join(self.directory, name)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(audio)
+        os.replace(temp_path, path)
+        with self._directory_lock(), self._lock:
+            # Other processes write and evict too; start from what is on disk
+            self._load_index()
+            evicted = 0
+            while self._bytes > self.max_bytes and len(self._index) > 1:
+                old_name, size = self._index.popitem(last=False)
+                self._bytes -= size
+                try:
+                    os.remove(os.path.join(self.directory, old_name))
+                    evicted += 1
+                except FileNotFoundError:
+                    pass
+            self.evictions += evicted
+        return path
+
+    @contextmanager
+    def _directory_lock(self):
+        """Serialise eviction between processes sharing the directory"""
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            yield
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._index),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions
+            }
+
+class SpeechSynthesizer:
+    """
+    Text-to-speech service: a pool of engine instances behind a
+    content-addressed clip cache, so repeated phrases cost one disk read.
+
+    Args:
+        engine_class: TTSEngine subclass; None resolves TTS_ENGINE
+        pool_size: Most engine instances synthesizing at once
+        cache: AudioCache, or None to always synthesize
+    """
+    def __init__(self, engine_class=None, pool_size=TTS_ENGINE_POOL_SIZE, cache=None):
+        self.engine_class = engine_class or select_engine_class()
+        self.format = self.engine_class.format
+        self.pool = EnginePool(self.engine_class, pool_size)
+        self.cache = cache
+        self._lock = threading.Lock()
+        self.synthesized = 0
+        self.total_synthesis_ms = 0.0
+
+    def key(self, text, voice="default"):
+        return cache_key(text, voice, self.format, self.engine_class.name)
+
+    def _synthesize(self, text, voice):
+        started = time.perf_counter()
+        with self.pool.engine() as engine:
+            audio = engine.synthesize(text, voice)
+        with self._lock:
+            self.synthesized += 1
+            self.total_synthesis_ms += (time.perf_counter() - started) * 1000
+        logger.info(f"Synthesized speech using {self.engine_class.name}: {text[:30]}...")
+        return audio
+
+    def synthesize(self, text, voice="default"):
+        """
+        Return the clip for text, from the cache when possible
+
+        Returns:
+            bytes: Audio in self.format
+        """
+        if self.cache is None:
+            return self._synthesize(text, voice)
+        key = self.key(text, voice)
+        audio = self.cache.read(key, self.format)
+        if audio is None:
+            audio = self._synthesize(text, voice)
+            self.cache.put(key, self.format, audio)
+        return audio
+
+    def lookup(self, text, voice="default"):
+        """Path of the cached clip for text, or None without synthesizing"""
+        if self.cache is None:
+            return None
+        return self.cache.get(self.key(text, voice), self.format)
+
+    def cached_path(self, text, voice="default"):
+        """Path of the cached clip for text, synthesizing it first if needed"""
+        if self.cache is None:
+            return None
+        key = self.key(text, voice)
+        path = self.cache.get(key, self.format)
+        if path is None:
+            path = self.cache.put(key, self.format, self._synthesize(text, voice))
+        return path
+
+    def stream(self, text, voice="default"):
+        """
+        Yield the clip for text sentence by sentence, so playback can start
+        once the first sentence is ready. Sentences are synthesized (or read
+        from the cache) concurrently, up to the engine pool size, and the
+        whole clip is cached once complete.
+
+        Yields:
+            bytes: Consecutive pieces of one playable file in self.format
+        """
+        futures = [io_executor.submit(self.synthesize, sentence, voice) for sentence in split_sentences(text) or [text]]
+        clips = []
+        for index, future in enumerate(futures):
+            clip = future.result()
+            clips.append(clip)
+            if self.format != "wav":
+                yield clip
+                continue
+            with wave.open(io.BytesIO(clip), 'rb') as part:
+                if index == 0:
+                    yield wav_stream_header(part.getparams())
+                yield part.readframes(part.getnframes())
+        if self.cache is not None:
+            self.cache.put(self.key(text, voice), self.format, join_audio(clips, self.format))
+
+    def prewarm(self, phrases=COMMON_REPLIES, voice="default"):
+        """Synthesize phrases not yet cached; stops at the first failure, which is logged, not raised"""
+        for phrase in phrases:
             try:
-                # Create a BytesIO object to store the audio
-                mp3_fp = BytesIO()
-                
-                # Generate speech
-                tts = self.gtts(text=text, lang='en')
-                tts.write_to_fp(mp3_fp)
-                
-                # Get the audio data
-                mp3_fp.seek(0)
-                audio_data = mp3_fp.read()
-                
-                logger.info(f"Synthesized speech using gTTS: {text[:30]}...")
-                return audio_data
-            
+                self.synthesize(phrase, voice)
             except Exception as e:
-                logger.error(f"Error using gTTS for TTS: {str(e)}")
-        
-        # If all else fails, return an error message
-        logger.error("No TTS engine available")
-        return b''  # Return empty bytes
+                logger.error(f"Error prewarming speech cache: {str(e)}")
+                return
+
+    def stats(self):
+        with self._lock:
+            report = {
+                "format": self.format,
+                "pool": self.pool.stats(),
+                "synthesized": self.synthesized,
+                "avg_synthesis_ms": self.total_synthesis_ms / self.synthesized if self.synthesized else 0.0
+            }
+        report["cache"] = self.cache.stats() if self.cache is not None else None
+        return report
+
+def wav_stream_header(params):
+    """RIFF header for a WAV of unknown length, as used when streaming"""
+    block_align = params.nchannels * params.sampwidth
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 0xFFFFFFFF, b'WAVE',
+        b'fmt ', 16, 1, params.nchannels, params.framerate, params.framerate * block_align, block_align, params.sampwidth * 8,
+        b'data', 0xFFFFFFFF
+    )
+
+def join_audio(clips, audio_format):
+    """
+    Concatenate clips into one playable file. MP3 frames can simply be
+    appended; WAV clips are re-wrapped under a single header.
+    """
+    if audio_format != "wav" or len(clips) < 2:
+        return b"".join(clips)
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as joined:
+        for index, clip in enumerate(clips):
+            with wave.open(io.BytesIO(clip), 'rb') as part:
+                if index == 0:
+                    joined.setparams(part.getparams())
+                joined.writeframes(part.readframes(part.getnframes()))
+    return output.getvalue()
+
+speech_synthesizer = SpeechSynthesizer(cache=AudioCache())
+metrics.register('tts', speech_synthesizer.stats)
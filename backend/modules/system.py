@@ -5,8 +5,8 @@ import logging
 import psutil
 import platform
 from datetime import datetime
-import google.generativeai as genai
-from config import GEMINI_API_KEY
+from utils import metrics
+from utils.capabilities import capabilities
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -18,15 +18,9 @@ system_bp = Blueprint('system', __name__)
 def system_status():
     """Get the current system status"""
     try:
-        # Check if Gemini API is available
-        gemini_available = False
-        try:
-            if GEMINI_API_KEY:
-                genai.configure(api_key=GEMINI_API_KEY)
-                models = genai.list_models()
-                gemini_available = any("gemini" in model.name for model in models)
-        except Exception as e:
-            logger.error(f"Error checking Gemini API: {str(e)}")
+        # Tool and service availability comes from the startup/background probes
+        features = capabilities.snapshot()
+        gemini_available = capabilities.available("gemini")
         
         # Get system information
         cpu_percent = psutil.cpu_percent()
@@ -35,22 +29,8 @@ def system_status():
         disk = psutil.disk_usage('/')
         disk_percent = disk.percent
         
-        # Check if ffmpeg is installed
-        ffmpeg_available = False
-        try:
-            import subprocess
-            subprocess.run(["ffmpeg", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-            ffmpeg_available = True
-        except:
-            pass
-        
-        # Check if speech recognition model is loaded
-        speech_recognition_available = False
-        try:
-            from transformers import Wav2Vec2ForCTC, Wav2Vec2Processor
-            speech_recognition_available = True
-        except:
-            pass
+        ffmpeg_available = capabilities.available("ffmpeg")
+        speech_recognition_available = capabilities.available("transformers")
         
         # Check module status
         modules_status = {
@@ -76,7 +56,9 @@ def system_status():
                 "ffmpeg": ffmpeg_available,
                 "speech_recognition": speech_recognition_available,
                 "gemini": gemini_available
-            }
+            },
+            "capabilities": features,
+            "metrics": metrics.snapshot()
         })
         
     except Exception as e:
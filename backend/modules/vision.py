@@ -1,15 +1,12 @@
 from flask import Blueprint, request, jsonify
-import os
 import time
 import logging
-import base64
-import numpy as np
-import cv2
-from PIL import Image
-import io
-import torch
-from ultralytics import YOLO
-from config import OBJECT_DETECTION_MODEL, IMAGE_UPLOAD_FOLDER
+from config import OBJECT_DETECTION_MAX_BATCH_SIZE, OBJECT_DETECTION_MAX_WAIT_MS, OBJECT_DETECTION_MAX_PENDING
+from modules.batching import MicroBatcher
+from modules.model_registry import model_registry, ModelLoadError
+from utils import metrics
+from utils.executors import PoolSaturated
+from utils.helpers import read_request_image
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -17,85 +14,97 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 vision_bp = Blueprint('vision', __name__)
 
-# Initialize YOLO model
-try:
-    model = YOLO(OBJECT_DETECTION_MODEL)
-    logger.info("YOLO model loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading YOLO model: {str(e)}")
-    model = None
+def get_detection_model():
+    """Shared YOLO model, loaded on first use; None if it cannot be loaded"""
+    try:
+        return model_registry.get("yolo")
+    except ModelLoadError:
+        return None
+
+def detections_from_result(result):
+    """Convert one YOLO result into the API's detection dicts"""
+    detections = []
+    for j, box in enumerate(result.boxes):
+        # Get box coordinates
+        x1, y1, x2, y2 = box.xyxy[0].tolist()
+        
+        # Get class and confidence
+        class_id = int(box.cls[0].item())
+        class_name = result.names[class_id]
+        confidence = float(box.conf[0].item())
+        
+        # Calculate width and height
+        width = x2 - x1
+        height = y2 - y1
+        
+        detections.append({
+            "id": j,
+            "class_id": class_id,
+            "class_name": class_name,
+            "confidence": confidence,
+            "bbox": {
+                "x1": x1,
+                "y1": y1,
+                "x2": x2,
+                "y2": y2,
+                "width": width,
+                "height": height
+            }
+        })
+    return detections
+
+def detect_batch(images):
+    """Run one batched YOLO forward pass over several decoded BGR images"""
+    results = model_registry.get("yolo")(images, verbose=False)
+    return [detections_from_result(result) for result in results]
+
+# Frames from concurrent requests are grouped into a single forward pass on
+# the batcher's thread; frames beyond OBJECT_DETECTION_MAX_PENDING get a 429
+detection_batcher = MicroBatcher(
+    detect_batch,
+    max_batch_size=OBJECT_DETECTION_MAX_BATCH_SIZE,
+    max_wait_ms=OBJECT_DETECTION_MAX_WAIT_MS,
+    name="object-detection",
+    max_pending=OBJECT_DETECTION_MAX_PENDING
+)
+metrics.register('object_detection', detection_batcher.stats)
+
+def detect_objects(image):
+    """
+    Run YOLO on a decoded BGR image, batched with any concurrent requests
+    
+    Args:
+        image: numpy array as returned by cv2.imdecode
+        
+    Returns:
+        list: Detection dicts for every box found
+    """
+    return detection_batcher(image)
 
 @vision_bp.route('/object-detect', methods=['POST'])
 def object_detect():
     """
     Detect objects in an image
     
-    Expected JSON payload:
-    {
-        "image": "base64_encoded_image"
-    }
+    Expected payload, one of:
+    - JSON: {"image": "base64_encoded_image"}
+    - Raw body with Content-Type image/jpeg (or any image/*)
+    - multipart/form-data with an "image" file
     """
     try:
-        data = request.json
+        try:
+            image, _ = read_request_image(request)
+        except ValueError:
+            return jsonify({"error": "Invalid request. 'image' could not be decoded"}), 400
         
-        if not data or 'image' not in data:
+        if image is None:
             return jsonify({"error": "Invalid request. 'image' is required"}), 400
-            
-        # Get the base64 image
-        image_data = data['image']
-        
-        # Remove the data URL prefix if present
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
-            
-        # Decode base64 image
-        image_bytes = base64.b64decode(image_data)
-        
-        # Convert to numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        # Save the image temporarily
-        temp_path = os.path.join(IMAGE_UPLOAD_FOLDER, f"temp_{int(time.time())}.jpg")
-        cv2.imwrite(temp_path, image)
-        
-        # Perform object detection
-        results = model(temp_path)
         
-        # Process results
-        detections = []
-        for i, result in enumerate(results):
-            boxes = result.boxes
-            for j, box in enumerate(boxes):
-                # Get box coordinates
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                
-                # Get class and confidence
-                class_id = int(box.cls[0].item())
-                class_name = result.names[class_id]
-                confidence = float(box.conf[0].item())
-                
-                # Calculate width and height
-                width = x2 - x1
-                height = y2 - y1
-                
-                detections.append({
-                    "id": j,
-                    "class_id": class_id,
-                    "class_name": class_name,
-                    "confidence": confidence,
-                    "bbox": {
-                        "x1": x1,
-                        "y1": y1,
-                        "x2": x2,
-                        "y2": y2,
-                        "width": width,
-                        "height": height
-                    }
-                })
+        if get_detection_model() is None:
+            return jsonify({"error": "Object detection model is not available"}), 503
         
-        # Clean up
-        os.remove(temp_path)
+        # Perform object detection on the in-memory frame
+        detections = detect_objects(image)
         
         return jsonify({
             "detections": detections,
@@ -103,6 +112,8 @@ def object_detect():
             "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
         })
         
+    except PoolSaturated:
+        raise
     except Exception as e:
         logger.error(f"Error in object detection: {str(e)}")
         return jsonify({"error": f"Error detecting objects: {str(e)}"}), 500
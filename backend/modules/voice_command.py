@@ -6,6 +6,7 @@ import logging
 import tempfile
 import wave
 import struct
+from utils.model_loading import load_model
 
 logger = logging.getLogger("JARVIS.VoiceCommand")
 
@@ -46,18 +47,8 @@ class VoiceCommandRecognizer:
             "set_timer", "add_reminder", "unknown"
         ]
         
-        # Initialize the model
-        self.model = AudioCNN(n_classes=len(self.commands)).to(self.device)
-        
-        # Load model if exists, otherwise use a new one
-        if os.path.exists(model_path):
-            logger.info(f"Loading voice command model from {model_path}")
-            self.model.load_state_dict(torch.load(model_path, map_location=self.device))
-        else:
-            logger.warning(f"Model not found at {model_path}, using untrained model")
-            # In a real system, you would train the model or download a pre-trained one
-        
-        self.model.eval()
+        # Load the exported TorchScript model if present, otherwise the eager one
+        self.model = load_model(AudioCNN, model_path, self.device, n_classes=len(self.commands))
         
         # Audio preprocessing
         self.sample_rate = 16000
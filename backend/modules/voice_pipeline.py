@@ -0,0 +1,233 @@
+import re
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import VOICE_PIPELINE_WORKERS, VOICE_STAGE_TIMEOUT_SECONDS
+from modules.llm import get_llm_backend, timed_stream
+from modules.speech_synthesis import SentenceSplitter, join_audio
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+VOICE_COMMAND_PROMPT = """
+The user said: "{transcription}"
+
+1. Identify the intent of this voice command.
+2. Provide a helpful response.
+
+Format your response as:
+Intent: [intent_category]
+Response: [your helpful response]
+"""
+
+class ReplyParser:
+    """
+    Separate the "Intent: ... Response: ..." header from a streamed reply.
+
+    Like the non-streaming endpoint, the markers may appear anywhere in the
+    reply and markdown emphasis around them (e.g. "**Intent:**") is ignored;
+    only the text after "Response:" is passed through. Text is held back
+    until both markers have arrived. A reply with no "Intent:" in its first
+    MAX_HEADER_CHARS characters is passed through whole, as is one that ends
+    without a complete header.
+    """
+    MAX_HEADER_CHARS = 200
+
+    _EMPHASIS = re.compile(r"\*+|__")
+    _INTENT = re.compile(r"intent\s*:", re.IGNORECASE)
+    _RESPONSE = re.compile(r"response\s*:", re.IGNORECASE)
+
+    def __init__(self):
+        self.buffer = ""
+        self.intent = "general_query"
+        self.in_response = False
+        self._response_started = False
+
+    def feed(self, text):
+        """Add a chunk and return the part of it that belongs to the response"""
+        if self.in_response:
+            return self._pass(text)
+        self.buffer += text
+        clean = self._EMPHASIS.sub("", self.buffer)
+        intent = self._INTENT.search(clean)
+        if intent is None:
+            if len(clean) <= self.MAX_HEADER_CHARS:
+                return ""
+            self.in_response = True
+            self._response_started = True
+            return self.buffer
+        response = self._RESPONSE.search(clean, intent.end())
+        if response is None:
+            return ""
+        intent_text = clean[intent.end():response.start()].strip().strip("[]").strip()
+        if intent_text:
+            self.intent = intent_text.lower().replace(" ", "_")
+        self.in_response = True
+        return self._pass(clean[response.end():])
+
+    def _pass(self, text):
+        # Drop whitespace and the rest of a "**Response:**" split across chunks
+        if not self._response_started:
+            text = text.lstrip(" \t\r\n*_")
+            self._response_started = bool(text)
+        return text
+
+    def flush(self):
+        """Return held-back text if the stream ended inside the header"""
+        if self.in_response:
+            return ""
+        self.in_response = True
+        return self.buffer
+
+class PipelineStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.total_asr_ms = 0.0
+        self.total_first_audio_ms = 0.0
+        self.total_reply_ms = 0.0
+
+    def record(self, asr_ms, first_audio_ms, reply_ms, error=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+            self.total_asr_ms += asr_ms or 0.0
+            self.total_first_audio_ms += first_audio_ms or 0.0
+            self.total_reply_ms += reply_ms
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "avg_asr_ms": self.total_asr_ms / self.requests if self.requests else 0.0,
+                "avg_first_audio_ms": self.total_first_audio_ms / self.requests if self.requests else 0.0,
+                "avg_reply_ms": self.total_reply_ms / self.requests if self.requests else 0.0
+            }
+
+pipeline_stats = PipelineStats()
+metrics.register('voice_pipeline', pipeline_stats.stats)
+
+# The pipeline's own threads: callers block on these stages, so they must
+# never share a pool with the callers (e.g. the I/O pool) or each other
+reply_executor = ThreadPoolExecutor(max_workers=VOICE_PIPELINE_WORKERS, thread_name_prefix="voice-reply")
+tts_executor = ThreadPoolExecutor(max_workers=VOICE_PIPELINE_WORKERS, thread_name_prefix="voice-tts")
+
+class VoicePipeline:
+    """
+    Voice command flow: transcription -> streamed LLM reply -> per-sentence TTS.
+
+    Each sentence is sent to TTS as soon as the LLM finishes it, while later
+    sentences are still being generated, so the first audio is ready after
+    roughly ASR + first-sentence latency rather than after the whole reply.
+
+    Every stage is injectable so tests can run the flow with local stubs:
+
+    Args:
+        transcribe: Callable taking a 16 kHz waveform and returning text
+        synthesize: Callable taking a sentence and returning audio bytes
+        audio_format: Format of the bytes synthesize returns
+        llm: LLMBackend to stream replies from; None uses the process-wide backend
+        timeout: Seconds to wait for the next sentence or its audio before giving up
+    """
+    def __init__(self, transcribe, synthesize, audio_format="mp3", llm=None, timeout=VOICE_STAGE_TIMEOUT_SECONDS):
+        self.transcribe = transcribe
+        self.synthesize = synthesize
+        self.audio_format = audio_format
+        self.llm = llm
+        self.timeout = timeout
+
+    def _produce(self, transcription, items, cancelled):
+        """Stream the reply, queueing a TTS job per sentence as it completes"""
+        try:
+            llm = self.llm if self.llm is not None else get_llm_backend()
+            parser = ReplyParser()
+            splitter = SentenceSplitter()
+            chunks = llm.stream(VOICE_COMMAND_PROMPT.format(transcription=transcription))
+            for chunk, _ in timed_stream(chunks):
+                if cancelled.is_set():
+                    return
+                for sentence in splitter.feed(parser.feed(chunk)):
+                    items.put(("sentence", (sentence, tts_executor.submit(self.synthesize, sentence))))
+            for sentence in splitter.feed(parser.flush()) + splitter.flush():
+                items.put(("sentence", (sentence, tts_executor.submit(self.synthesize, sentence))))
+            items.put(("end", parser.intent))
+        except Exception as e:
+            items.put(("error", e))
+
+    def respond(self, transcription, asr_ms=None):
+        """
+        Generate the spoken reply to a transcribed command
+
+        Yields:
+            tuple: ("sentence", {"index", "text", "audio"}) per sentence in
+            order, audio being bytes or None if TTS failed, then ("done", summary)
+
+        Raises:
+            TimeoutError: If the LLM produced nothing for self.timeout seconds
+            Exception: Whatever the LLM stage raised
+        """
+        started = time.perf_counter()
+        first_audio_ms = None
+        error = False
+        items = queue.Queue()
+        cancelled = threading.Event()
+        reply_executor.submit(self._produce, transcription, items, cancelled)
+        sentences = []
+        try:
+            while True:
+                try:
+                    kind, payload = items.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No reply from the LLM within {self.timeout}s")
+                if kind == "error":
+                    raise payload
+                if kind == "end":
+                    reply_ms = (time.perf_counter() - started) * 1000
+                    yield "done", {
+                        "command": transcription,
+                        "intent": payload,
+                        "response": " ".join(sentences),
+                        "format": self.audio_format,
+                        "asr_ms": asr_ms,
+                        "first_audio_ms": first_audio_ms,
+                        "reply_ms": reply_ms
+                    }
+                    return
+                sentence, future = payload
+                try:
+                    audio = future.result(timeout=self.timeout)
+                except Exception as e:
+                    logger.error(f"Error synthesizing sentence: {str(e)}")
+                    audio = None
+                if first_audio_ms is None and audio:
+                    first_audio_ms = (time.perf_counter() - started) * 1000
+                yield "sentence", {"index": len(sentences), "text": sentence, "audio": audio}
+                sentences.append(sentence)
+        except Exception:
+            error = True
+            raise
+        finally:
+            # Stops the LLM stream early if the client went away
+            cancelled.set()
+            pipeline_stats.record(asr_ms, first_audio_ms, (time.perf_counter() - started) * 1000, error)
+
+    def collect(self, transcription, asr_ms=None):
+        """
+        Run respond() to completion for clients that want one response
+
+        Returns:
+            dict: The "done" summary plus "audio", the sentences' audio joined
+            into one clip
+        """
+        audio = []
+        for event, data in self.respond(transcription, asr_ms):
+            if event == "sentence":
+                if data["audio"]:
+                    audio.append(data["audio"])
+            else:
+                data["audio"] = join_audio(audio, self.audio_format)
+                return data
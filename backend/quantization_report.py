@@ -0,0 +1,116 @@
+import io
+import os
+import json
+import argparse
+import numpy as np
+import cv2
+import torch
+from modules.face_auth import FaceNet
+from utils.model_loading import load_eager_model, quantize_dynamic
+from export_models import model_specs, time_inference
+
+# Same acceptance threshold FaceAuthenticator.authenticate uses
+MATCH_THRESHOLD = 0.7
+
+def load_face(image_path):
+    # Same preprocessing train_face_model.py used to build face_db.json
+    image = cv2.imread(image_path)
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    image = cv2.resize(image, (64, 64))
+    image = image / 255.0
+    image = np.transpose(image, (2, 0, 1))
+    return torch.FloatTensor(image).unsqueeze(0)
+
+def normalize_rows(matrix):
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=-1, keepdims=True), 1e-12)
+
+def best_matches(embeddings, user_ids, stored):
+    similarities = normalize_rows(embeddings) @ normalize_rows(stored).T
+    best = similarities.argmax(axis=1)
+    scores = similarities[np.arange(len(best)), best]
+    return [user_ids[index] if score >= MATCH_THRESHOLD else None for index, score in zip(best, scores)]
+
+def report_drift(args):
+    if not os.path.exists(args.face_db):
+        print(f"Skipping embedding drift: {args.face_db} not found (run train_face_model.py first)")
+        return
+    if not os.path.exists(args.model_path):
+        # Untrained weights would only measure int8 arithmetic error, not identification accuracy
+        print(f"Skipping embedding drift: trained weights {args.model_path} not found (run train_face_model.py first)")
+        return
+    with open(args.face_db, 'r') as f:
+        face_db = json.load(f)
+    fp32 = load_eager_model(FaceNet, args.model_path, torch.device("cpu"))
+    int8 = quantize_dynamic(fp32)
+    user_ids = list(face_db)
+    stored = np.array([face_db[user_id]["embedding"] for user_id in user_ids])
+    print(f"{'user':<16}{'images':>8}{'img cos':>10}{'fp32 vs db':>12}{'int8 vs db':>12}")
+    all_fp32, all_int8 = [], []
+    for index, user_id in enumerate(user_ids):
+        user_dir = os.path.join(args.data_dir, user_id)
+        if not os.path.isdir(user_dir):
+            print(f"{user_id:<16}  no images in {user_dir}")
+            continue
+        images = sorted(f for f in os.listdir(user_dir) if f.endswith(('.jpg', '.jpeg', '.png')))[:args.max_images]
+        if not images:
+            continue
+        batch = torch.cat([load_face(os.path.join(user_dir, image)) for image in images])
+        with torch.no_grad():
+            fp32_embeddings = fp32(batch).numpy()
+            int8_embeddings = int8(batch).numpy()
+        image_cosine = np.sum(normalize_rows(fp32_embeddings) * normalize_rows(int8_embeddings), axis=1)
+        reference = normalize_rows(stored[index])
+        fp32_cosine = float(normalize_rows(fp32_embeddings.mean(axis=0)) @ reference)
+        int8_cosine = float(normalize_rows(int8_embeddings.mean(axis=0)) @ reference)
+        print(f"{user_id:<16}{len(images):>8}{image_cosine.mean():>10.4f}{fp32_cosine:>12.4f}{int8_cosine:>12.4f}")
+        all_fp32.append(fp32_embeddings)
+        all_int8.append(int8_embeddings)
+    if not all_fp32:
+        return
+    fp32_matches = best_matches(np.concatenate(all_fp32), user_ids, stored)
+    int8_matches = best_matches(np.concatenate(all_int8), user_ids, stored)
+    agreement = np.mean([a == b for a, b in zip(fp32_matches, int8_matches)])
+    print(f"Identification agreement with fp32 (threshold {MATCH_THRESHOLD}): {agreement * 100:.1f}% of {len(fp32_matches)} images")
+
+def serialized_mb(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+def report_performance(args):
+    print(f"{'model':<16}{'path':<8}{'weights MB':>12}{'median ms':>12}{'p95 ms':>12}")
+    device = torch.device("cpu")
+    untrained = []
+    for name, (model_class, model_path, model_kwargs, example_input) in model_specs().items():
+        if not os.path.exists(model_path):
+            untrained.append(name)
+        fp32 = load_eager_model(model_class, model_path, device, **model_kwargs)
+        int8 = quantize_dynamic(fp32)
+        results = {}
+        for label, model in (("fp32", fp32), ("int8", int8)):
+            median, p95 = time_inference(model, example_input, args.iterations, args.warmup)
+            results[label] = (serialized_mb(model), median)
+            print(f"{name:<16}{label:<8}{results[label][0]:>12.2f}{median:>12.3f}{p95:>12.3f}")
+        size_delta = results["int8"][0] / results["fp32"][0] - 1
+        latency_delta = results["int8"][1] / results["fp32"][1] - 1
+        print(f"{name:<16}{'delta':<8}{size_delta * 100:>11.1f}%{latency_delta * 100:>11.1f}%")
+    if untrained:
+        print(f"Untrained weights for {', '.join(untrained)}: size and latency hold, but say nothing about accuracy")
+
+def main():
+    parser = argparse.ArgumentParser(description='Report accuracy drift, latency and memory of int8 dynamic quantization')
+    parser.add_argument('--face_db', type=str, default='data/face_embeddings/face_db.json', help='fp32 embeddings written by train_face_model.py')
+    parser.add_argument('--data_dir', type=str, default='data/face_images', help='Directory containing face images per user')
+    parser.add_argument('--model_path', type=str, default='models/facenet.pth', help='FaceNet weights the database was built with')
+    parser.add_argument('--max_images', type=int, default=50, help='Most images per user to embed')
+    parser.add_argument('--iterations', type=int, default=100, help='Timed iterations per model and path')
+    parser.add_argument('--warmup', type=int, default=10, help='Untimed warmup iterations per model and path')
+    args = parser.parse_args()
+    torch.set_grad_enabled(False)
+    print("Embedding drift (FaceNet)")
+    report_drift(args)
+    print("\nLatency and weight size")
+    report_performance(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+from modules.chat_history import ChatHistoryStore
+from modules.conversation_cache import ConversationCache
+
+def turn(user, assistant):
+    return {"role": "user", "content": user}, {"role": "assistant", "content": assistant}
+
+def texts(window):
+    return [content["parts"][0] for content in window]
+
+def test_window_holds_the_last_turns_as_pairs(tmp_path):
+    cache = ConversationCache(ChatHistoryStore(str(tmp_path)), window_turns=2)
+    for i in range(3):
+        cache.append("u", *turn(f"q{i}", f"a{i}"))
+    assert texts(cache.window("u")) == ["q1", "a1", "q2", "a2"]
+
+def test_cached_window_is_served_without_reloading(tmp_path):
+    cache = ConversationCache(ChatHistoryStore(str(tmp_path)), window_turns=2)
+    cache.window("u")
+    cache.append("u", *turn("q", "a"))
+    assert texts(cache.window("u")) == ["q", "a"]
+    assert cache.stats()["misses"] == 1
+
+def test_window_reloads_after_another_process_appends(tmp_path):
+    first = ConversationCache(ChatHistoryStore(str(tmp_path)), window_turns=2)
+    second = ConversationCache(ChatHistoryStore(str(tmp_path)), window_turns=2)
+    assert first.window("u") == []
+    second.append("u", *turn("q0", "a0"))
+    assert texts(first.window("u")) == ["q0", "a0"]
+    # first's own append must not paper over a write it never saw
+    second.append("u", *turn("q1", "a1"))
+    first.append("u", *turn("q2", "a2"))
+    assert texts(first.window("u")) == ["q1", "a1", "q2", "a2"]
@@ -0,0 +1,39 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from modules import intent_classifier
+from modules.intent_classifier import IntentClassifier
+
+TEXTS = [
+    "what is the weather like today",
+    "set an alarm",
+    "",
+    "play some music in the kitchen please",
+    "who is the president",
+    "call mom"
+]
+
+@pytest.fixture
+def classifier(tmp_path):
+    torch.manual_seed(0)
+    return IntentClassifier(model_path=str(tmp_path / "intent_classifier.pth"), vocab_path=str(tmp_path / "intent_vocab.json"))
+
+def test_classify_batch_agrees_with_classify(classifier, monkeypatch):
+    # Accept every model prediction so the comparison isn't hidden behind the keyword rules
+    monkeypatch.setattr(intent_classifier, "CONFIDENCE_THRESHOLD", -1.0)
+    for batch_size in (1, 4, 64):
+        batched = classifier.classify_batch(TEXTS, batch_size=batch_size)
+        assert [intent for intent, _ in batched] == [classifier.classify(text) for text in TEXTS]
+
+def test_batched_confidences_match_single_text_forward(classifier):
+    batched = classifier.classify_batch(TEXTS)
+    for text, (_, confidence) in zip(TEXTS, batched):
+        with torch.no_grad():
+            single = torch.softmax(classifier.model(classifier.tokenizer.encode(text)), 1).max().item()
+        assert confidence == pytest.approx(single, abs=1e-5)
+
+def test_low_confidence_falls_back_to_rules_in_both_paths(classifier, monkeypatch):
+    monkeypatch.setattr(intent_classifier, "CONFIDENCE_THRESHOLD", 2.0)
+    batched = classifier.classify_batch(TEXTS)
+    assert [intent for intent, _ in batched] == [classifier.classify(text) for text in TEXTS]
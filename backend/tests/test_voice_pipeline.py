@@ -0,0 +1,113 @@
+import io
+import wave
+import threading
+import pytest
+from modules.llm import FakeLLMBackend
+from modules.speech_synthesis import SentenceSplitter
+from modules.voice_pipeline import ReplyParser, VoicePipeline
+
+def feed_all(feeder, chunks):
+    out = []
+    for chunk in chunks:
+        out.extend(feeder.feed(chunk))
+    return out + feeder.flush()
+
+def parse(chunks):
+    parser = ReplyParser()
+    text = "".join(parser.feed(chunk) for chunk in chunks) + parser.flush()
+    return parser.intent, text
+
+def make_wav(frames):
+    output = io.BytesIO()
+    with wave.open(output, 'wb') as clip:
+        clip.setnchannels(1)
+        clip.setsampwidth(2)
+        clip.setframerate(16000)
+        clip.writeframes(frames)
+    return output.getvalue()
+
+class StubSynthesizer:
+    """Returns the sentence itself as its "audio", optionally failing on one"""
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.sentences = []
+        self._lock = threading.Lock()
+
+    def __call__(self, sentence):
+        with self._lock:
+            self.sentences.append(sentence)
+        if sentence == self.fail_on:
+            raise RuntimeError("synthesis failed")
+        return sentence.encode('utf-8')
+
+def test_sentence_splitter_waits_for_text_after_the_boundary():
+    splitter = SentenceSplitter()
+    assert splitter.feed("Hello there.") == []
+    assert splitter.feed(" How are") == ["Hello there."]
+    assert splitter.feed(" you? Fine") == ["How are you?"]
+    assert splitter.flush() == ["Fine"]
+    assert splitter.flush() == []
+
+def test_sentence_splitter_matches_one_shot_split():
+    text = "First one. Second one! Third one? Last"
+    chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+    assert feed_all(SentenceSplitter(), chunks) == ["First one.", "Second one!", "Third one?", "Last"]
+
+def test_reply_parser_extracts_header_split_across_chunks():
+    assert parse(["Inte", "nt: Weather Query\nResp", "onse: It is ", "sunny."]) == ("weather_query", "It is sunny.")
+
+def test_reply_parser_ignores_markdown_emphasis():
+    assert parse(["**Intent:** greeting\n**Response:*", "* Hello there."]) == ("greeting", "Hello there.")
+
+def test_reply_parser_finds_header_after_preamble():
+    assert parse(["Sure!\nIntent: [timer]\nResponse: Timer set."]) == ("timer", "Timer set.")
+
+def test_reply_parser_passes_through_reply_without_header():
+    reply = "Just a plain answer, with no header at all. " * 10
+    assert parse([reply[i:i + 7] for i in range(0, len(reply), 7)]) == ("general_query", reply)
+
+def test_reply_parser_returns_incomplete_header_on_flush():
+    assert parse(["Intent: weather"]) == ("general_query", "Intent: weather")
+
+def test_respond_streams_sentences_in_order():
+    llm = FakeLLMBackend(reply="Intent: greeting Response: Hi there. How can I help? Ask away")
+    synthesize = StubSynthesizer()
+    events = list(VoicePipeline(lambda waveform: "", synthesize, llm=llm).respond("hello", asr_ms=5.0))
+    sentences = [data for event, data in events if event == "sentence"]
+    assert [data["index"] for data in sentences] == [0, 1, 2]
+    assert [data["text"] for data in sentences] == ["Hi there.", "How can I help?", "Ask away"]
+    assert [data["audio"] for data in sentences] == [b"Hi there.", b"How can I help?", b"Ask away"]
+    event, summary = events[-1]
+    assert event == "done"
+    assert summary["intent"] == "greeting"
+    assert summary["command"] == "hello"
+    assert summary["response"] == "Hi there. How can I help? Ask away"
+    assert summary["asr_ms"] == 5.0
+    assert summary["first_audio_ms"] is not None
+
+def test_respond_yields_none_audio_when_synthesis_fails():
+    llm = FakeLLMBackend(reply="One. Two. Three.")
+    pipeline = VoicePipeline(lambda waveform: "", StubSynthesizer(fail_on="Two."), llm=llm)
+    audio = [data["audio"] for event, data in pipeline.respond("count") if event == "sentence"]
+    assert audio == [b"One.", None, b"Three."]
+
+def test_respond_times_out_when_the_llm_stalls():
+    llm = FakeLLMBackend(reply="Too late.", first_token_delay=1.0)
+    pipeline = VoicePipeline(lambda waveform: "", StubSynthesizer(), llm=llm, timeout=0.1)
+    with pytest.raises(TimeoutError):
+        list(pipeline.respond("hello"))
+
+def test_collect_joins_sentence_audio():
+    llm = FakeLLMBackend(reply="Intent: chat Response: One. Two.")
+    reply = VoicePipeline(lambda waveform: "", StubSynthesizer(), llm=llm).collect("hi")
+    assert reply["intent"] == "chat"
+    assert reply["response"] == "One. Two."
+    assert reply["audio"] == b"One.Two."
+    assert reply["format"] == "mp3"
+
+def test_collect_joins_wav_clips_under_one_header():
+    clips = {"One.": make_wav(b"\x01\x00" * 10), "Two.": make_wav(b"\x02\x00" * 20)}
+    llm = FakeLLMBackend(reply="One. Two.")
+    reply = VoicePipeline(lambda waveform: "", clips.get, audio_format="wav", llm=llm).collect("hi")
+    with wave.open(io.BytesIO(reply["audio"]), 'rb') as joined:
+        assert joined.getnframes() == 30
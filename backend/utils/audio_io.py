@@ -0,0 +1,130 @@
+import io
+import os
+import math
+import logging
+import tempfile
+import subprocess
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+from config import AUDIO_UPLOAD_FOLDER
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+
+# Longest ffmpeg may take to decode one upload before the request gives up on it
+FFMPEG_TIMEOUT_SECONDS = 30
+
+class AudioDecodeError(ValueError):
+    """Raised when uploaded audio cannot be decoded by any available path"""
+
+def resample(waveform, orig_sample_rate, target_sample_rate=TARGET_SAMPLE_RATE):
+    """
+    Resample a mono waveform with a polyphase anti-aliasing filter
+
+    Args:
+        waveform: 1-D float32 numpy array
+        orig_sample_rate: Sample rate of waveform
+        target_sample_rate: Desired sample rate
+
+    Returns:
+        numpy array: Resampled float32 waveform
+    """
+    if orig_sample_rate == target_sample_rate or len(waveform) == 0:
+        return waveform
+    divisor = math.gcd(int(orig_sample_rate), int(target_sample_rate))
+    up, down = int(target_sample_rate) // divisor, int(orig_sample_rate) // divisor
+    return resample_poly(waveform, up, down).astype(np.float32)
+
+def _decode_with_soundfile(data, sample_rate):
+    waveform, orig_sample_rate = sf.read(io.BytesIO(data), dtype='float32', always_2d=True)
+    # Downmix to mono
+    waveform = waveform.mean(axis=1) if waveform.shape[1] > 1 else waveform[:, 0]
+    return resample(waveform, orig_sample_rate, sample_rate)
+
+def _ffmpeg_command(source, sample_rate):
+    return [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-i", source,
+        "-f", "s16le",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "-ac", "1",
+        "pipe:1"
+    ]
+
+def _decode_with_ffmpeg(data, sample_rate):
+    try:
+        result = subprocess.run(
+            _ffmpeg_command("pipe:0", sample_rate),
+            input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+            timeout=FFMPEG_TIMEOUT_SECONDS
+        )
+        pcm = result.stdout
+    except subprocess.CalledProcessError:
+        # Some containers (e.g. mp4/m4a) need a seekable input; use a unique temp file
+        fd, temp_path = tempfile.mkstemp(prefix="upload_", dir=AUDIO_UPLOAD_FOLDER)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            result = subprocess.run(
+                _ffmpeg_command(temp_path, sample_rate),
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True,
+                timeout=FFMPEG_TIMEOUT_SECONDS
+            )
+            pcm = result.stdout
+        finally:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+
+def decode_audio(data, sample_rate=TARGET_SAMPLE_RATE):
+    """
+    Decode uploaded audio bytes to a mono float32 waveform in memory
+
+    WAV/FLAC/OGG and other formats libsndfile understands are decoded
+    in-process; anything else (webm, mp3, m4a, ...) is piped through ffmpeg.
+
+    Args:
+        data: Raw bytes of the uploaded file
+        sample_rate: Sample rate of the returned waveform
+
+    Returns:
+        numpy array: Mono float32 waveform in [-1, 1]
+
+    Raises:
+        AudioDecodeError: If no decoder could handle the data
+    """
+    if not data:
+        raise AudioDecodeError("Empty audio upload")
+    try:
+        return _decode_with_soundfile(data, sample_rate)
+    except Exception as e:
+        logger.info(f"soundfile could not decode upload ({str(e)}), falling back to ffmpeg")
+    try:
+        return _decode_with_ffmpeg(data, sample_rate)
+    except FileNotFoundError:
+        raise AudioDecodeError("ffmpeg is not installed and the audio format is not supported natively")
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError(f"ffmpeg did not finish decoding within {FFMPEG_TIMEOUT_SECONDS}s")
+    except subprocess.CalledProcessError as e:
+        stderr = e.stderr.decode('utf-8', errors='replace').strip() if e.stderr else ''
+        raise AudioDecodeError(f"ffmpeg could not decode audio: {stderr}")
+
+def to_pcm16(waveform):
+    """
+    Convert a float waveform to 16-bit little-endian PCM bytes
+
+    Args:
+        waveform: float numpy array in [-1, 1]
+
+    Returns:
+        bytes: PCM samples
+    """
+    return (np.clip(waveform, -1.0, 1.0) * 32767).astype('<i2').tobytes()
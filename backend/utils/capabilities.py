@@ -0,0 +1,124 @@
+import shutil
+import logging
+import threading
+import subprocess
+import importlib.util
+from datetime import datetime
+from config import (
+    GEMINI_API_KEY, GEMINI_API_BASE_URL, HTTP_CONNECT_TIMEOUT, CAPABILITY_REFRESH_SECONDS, CAPABILITY_PROBE_TIMEOUT_SECONDS
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class CapabilityRegistry:
+    """
+    Probes optional tools and services from a background thread so request
+    handlers only read a snapshot. Until a capability's first probe has
+    finished it reads as unavailable.
+    """
+    def __init__(self, ttl=CAPABILITY_REFRESH_SECONDS):
+        self.ttl = ttl
+        self._probes = {}
+        self._results = {}
+        self._lock = threading.Lock()
+        self._refreshed = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, probe):
+        """
+        Register a capability probe
+
+        Args:
+            name: Capability name
+            probe: Zero-argument callable returning True if available
+        """
+        with self._lock:
+            self._probes[name] = probe
+
+    def refresh(self):
+        """Run every probe now, publishing each result as soon as it is known"""
+        with self._lock:
+            probes = dict(self._probes)
+        results = {}
+        for name, probe in probes.items():
+            try:
+                available = bool(probe())
+            except Exception as e:
+                logger.warning(f"Capability probe {name} failed: {str(e)}")
+                available = False
+            results[name] = {
+                "available": available,
+                "checked_at": datetime.now().isoformat()
+            }
+            # Cheap local probes become visible without waiting on network ones
+            with self._lock:
+                self._results = {**self._results, name: results[name]}
+        self._refreshed.set()
+        return results
+
+    def start(self):
+        """Probe once, then every ttl seconds, on a background thread"""
+        with self._lock:
+            # After a fork the copied thread object is dead and has to be replaced
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="capability-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        self.refresh()
+        while self.ttl > 0 and not self._stop.wait(self.ttl):
+            self.refresh()
+
+    def _ensure_probed(self):
+        # Outside the server (scripts, tests) nothing called start(); kick it off
+        # without blocking the caller on the probes
+        if not self._refreshed.is_set():
+            self.start()
+
+    def available(self, name):
+        """Return the cached availability of a capability"""
+        self._ensure_probed()
+        with self._lock:
+            result = self._results.get(name)
+        return bool(result and result["available"])
+
+    def snapshot(self):
+        """Return {name: {"available", "checked_at"}} without probing"""
+        self._ensure_probed()
+        with self._lock:
+            return {name: dict(result) for name, result in self._results.items()}
+
+def _probe_ffmpeg():
+    if shutil.which("ffmpeg") is None:
+        return False
+    subprocess.run(["ffmpeg", "-version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return True
+
+def _probe_module(module_name):
+    return lambda: importlib.util.find_spec(module_name) is not None
+
+def _probe_gemini():
+    if not GEMINI_API_KEY:
+        return False
+    from modules.http_client import get_http_client
+    response = get_http_client().get(
+        f"{GEMINI_API_BASE_URL}/v1beta/models",
+        headers={"x-goog-api-key": GEMINI_API_KEY},
+        timeout=(HTTP_CONNECT_TIMEOUT, CAPABILITY_PROBE_TIMEOUT_SECONDS)
+    )
+    if response.status_code != 200:
+        return False
+    return any("gemini" in model.get("name", "") for model in response.json().get("models", []))
+
+capabilities = CapabilityRegistry()
+capabilities.register("ffmpeg", _probe_ffmpeg)
+capabilities.register("transformers", _probe_module("transformers"))
+capabilities.register("torchaudio", _probe_module("torchaudio"))
+capabilities.register("speech_recognition", _probe_module("speech_recognition"))
+capabilities.register("gemini", _probe_gemini)
@@ -0,0 +1,162 @@
+import os
+import math
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    IO_WORKERS, TORCH_NUM_THREADS, WEB_CONCURRENCY, FACE_WORKERS, FACE_QUEUE_DEPTH, SPEECH_WORKERS, SPEECH_QUEUE_DEPTH
+)
+from utils import metrics
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+class PoolSaturated(Exception):
+    """Raised instead of queueing work on a pool that is already full"""
+    def __init__(self, pool_name, retry_after):
+        super().__init__(f"{pool_name} pool is saturated, retry after {retry_after}s")
+        self.pool_name = pool_name
+        self.retry_after = retry_after
+
+class BoundedExecutor:
+    """
+    Thread pool for one class of CPU-heavy work with admission control.
+
+    At most max_workers jobs run at once and at most max_queue more wait;
+    anything beyond that is rejected immediately with PoolSaturated so the
+    caller can shed load instead of piling up latency. Time spent queued
+    is tracked per pool.
+    """
+    def __init__(self, name, max_workers, max_queue):
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.last_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    def retry_after(self):
+        """Seconds until a slot is likely to free up, from the average job time"""
+        with self._lock:
+            average_s = self.total_run_ms / self.completed / 1000 if self.completed else 1.0
+            backlog = self.active + self.queued
+        return min(60, max(1, math.ceil(average_s * backlog / self.max_workers)))
+
+    def _run(self, fn, enqueued, args, kwargs):
+        started = time.perf_counter()
+        wait_ms = (started - enqueued) * 1000
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.total_wait_ms += wait_ms
+            self.last_wait_ms = wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.total_run_ms += (time.perf_counter() - started) * 1000
+            self._slots.release()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs)
+
+        Returns:
+            Future: Resolved with fn's result
+
+        Raises:
+            PoolSaturated: If max_workers + max_queue jobs are already admitted
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PoolSaturated(self.name, self.retry_after())
+        with self._lock:
+            self.queued += 1
+        try:
+            return self._executor.submit(self._run, fn, time.perf_counter(), args, kwargs)
+        except Exception:
+            with self._lock:
+                self.queued -= 1
+            self._slots.release()
+            raise
+
+    def run(self, fn, *args, **kwargs):
+        """Run fn on the pool and block until it finishes"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def stats(self):
+        with self._lock:
+            started = self.completed + self.active
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_queue_wait_ms": self.total_wait_ms / started if started else 0.0,
+                "max_queue_wait_ms": self.max_wait_ms,
+                "last_queue_wait_ms": self.last_wait_ms,
+                "avg_run_ms": self.total_run_ms / self.completed if self.completed else 0.0
+            }
+
+# One pool per endpoint class so a burst on one cannot starve the others.
+# Object detection is bounded by its MicroBatcher instead, which runs YOLO
+# on a thread of its own and needs every waiting frame to fill its batches
+pools = {
+    "face": BoundedExecutor("face", FACE_WORKERS, FACE_QUEUE_DEPTH),
+    "speech": BoundedExecutor("speech", SPEECH_WORKERS, SPEECH_QUEUE_DEPTH)
+}
+metrics.register('pools', lambda: {name: pool.stats() for name, pool in pools.items()})
+
+# Fan-out for blocking calls a request makes several of at once, e.g. the
+# per-sentence TTS of a streamed clip. Single blocking calls (LLM, gTTS) run
+# on the request's own gunicorn thread
+io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+_torch_threads_configured = False
+_torch_threads_lock = threading.Lock()
+
+def configure_torch_threads():
+    """
+    Split the cores between every concurrent torch job on the machine: each
+    server process's pool workers plus its object detection batcher thread,
+    so parallel ops in different pools and processes don't oversubscribe the
+    CPU. Runs once per process, before the first model is loaded.
+    """
+    global _torch_threads_configured
+    if _torch_threads_configured:
+        return
+    with _torch_threads_lock:
+        if _torch_threads_configured:
+            return
+        _torch_threads_configured = True
+        try:
+            import torch
+        except ImportError:
+            return
+        threads = TORCH_NUM_THREADS
+        if threads <= 0:
+            jobs_per_process = sum(pool.max_workers for pool in pools.values()) + 1
+            concurrent_jobs = jobs_per_process * max(1, WEB_CONCURRENCY)
+            threads = max(1, (os.cpu_count() or 1) // concurrent_jobs)
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Only allowed before any inter-op parallel work has started
+            pass
+        logger.info(f"torch intra-op threads per job: {threads}")
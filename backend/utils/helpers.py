@@ -1,4 +1,5 @@
 import os
+import json
 import base64
 import numpy as np
 import cv2
@@ -25,15 +26,70 @@ def decode_base64_image(base64_string):
         # Decode base64 image
         image_bytes = base64.b64decode(base64_string)
         
-        # Convert to numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-        return image
+        return decode_image_bytes(image_bytes)
     except Exception as e:
         logger.error(f"Error decoding base64 image: {str(e)}")
         return None
 
+def decode_image_bytes(buffer):
+    """
+    Decode encoded image bytes (JPEG, PNG, ...) without copying them
+    
+    Args:
+        buffer: bytes-like object holding the encoded image
+        
+    Returns:
+        numpy array: Decoded BGR image, or None if it could not be decoded
+    """
+    nparr = np.frombuffer(buffer, np.uint8)
+    if nparr.size == 0:
+        return None
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+def read_request_image(req, field='image'):
+    """
+    Read an image from a Flask request in any of the supported encodings:
+    a raw image/* (or application/octet-stream) body, a multipart file
+    named `field`, or a JSON body with a base64 data URL under `field`
+    
+    Args:
+        req: Flask request
+        field: Name of the image field for multipart and JSON requests
+        
+    Returns:
+        tuple: (image, fields) where image is the decoded BGR image or None
+        if no image was sent, and fields holds the remaining parameters
+        (query string for raw bodies, form fields for multipart, the JSON
+        object otherwise)
+        
+    Raises:
+        ValueError: If an image was sent but could not be decoded
+    """
+    mimetype = req.mimetype or ''
+    if mimetype.startswith('image/') or mimetype == 'application/octet-stream':
+        buffer = req.get_data(cache=False)
+        fields = req.args.to_dict()
+    elif field in req.files:
+        buffer = req.files[field].read()
+        fields = req.args.to_dict()
+        fields.update(req.form.to_dict())
+    else:
+        fields = req.get_json(silent=True) or {}
+        if not isinstance(fields, dict) or field not in fields:
+            return None, fields if isinstance(fields, dict) else {}
+        image_data = fields[field]
+        if not isinstance(image_data, str):
+            raise ValueError(f"'{field}' must be a base64 string")
+        if ',' in image_data:
+            image_data = image_data.split(',', 1)[1]
+        buffer = base64.b64decode(image_data)
+    if not buffer:
+        return None, fields
+    image = decode_image_bytes(buffer)
+    if image is None:
+        raise ValueError(f"'{field}' could not be decoded as an image")
+    return image, fields
+
 def encode_image_to_base64(image):
     """
     Encode an image to base64
@@ -55,3 +111,17 @@ def encode_image_to_base64(image):
     except Exception as e:
         logger.error(f"Error encoding image to base64: {str(e)}")
         return None
+
+def format_sse(data, event=None):
+    """
+    Format one Server-Sent Events message
+    
+    Args:
+        data: JSON-serialisable payload
+        event: Optional event name
+        
+    Returns:
+        str: The encoded event, terminated by a blank line
+    """
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
@@ -0,0 +1,36 @@
+import logging
+import threading
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_providers = {}
+_lock = threading.Lock()
+
+def register(name, provider):
+    """
+    Register a callable that returns a JSON-serialisable dict of stats
+
+    Args:
+        name: Key the stats are reported under in /system-status
+        provider: Zero-argument callable returning the stats dict
+    """
+    with _lock:
+        _providers[name] = provider
+
+def snapshot():
+    """
+    Collect the current stats from every registered provider
+
+    Returns:
+        dict: Stats keyed by provider name
+    """
+    with _lock:
+        providers = dict(_providers)
+    stats = {}
+    for name, provider in providers.items():
+        try:
+            stats[name] = provider()
+        except Exception as e:
+            logger.error(f"Error collecting metrics for {name}: {str(e)}")
+    return stats
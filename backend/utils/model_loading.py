@@ -0,0 +1,78 @@
+import os
+import logging
+import torch
+import torch.nn as nn
+from config import TORCHSCRIPT_ENABLED, QUANTIZE_MODELS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def torchscript_path(model_path):
+    """Path of the TorchScript artifact exported for a .pth state dict"""
+    return os.path.splitext(model_path)[0] + '.torchscript.pt'
+
+def load_eager_model(model_class, model_path, device, **model_kwargs):
+    """
+    Build an eager model and load its state dict when one exists
+
+    Args:
+        model_class: nn.Module subclass to instantiate
+        model_path: Path to the .pth state dict
+        device: torch.device to load onto
+        **model_kwargs: Constructor arguments for model_class
+
+    Returns:
+        nn.Module: The model in eval mode, untrained if model_path does not exist
+    """
+    model = model_class(**model_kwargs).to(device)
+    if os.path.exists(model_path):
+        logger.info(f"Loading {model_class.__name__} weights from {model_path}")
+        model.load_state_dict(torch.load(model_path, map_location=device))
+    else:
+        logger.warning(f"Model not found at {model_path}, using untrained model")
+    model.eval()
+    return model
+
+def quantize_dynamic(model):
+    """
+    Dynamically quantize a model's Linear and LSTM layers to int8
+
+    Weights are stored as int8 and activations are quantized on the fly,
+    so no calibration data is needed. CPU only.
+    """
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear, nn.LSTM}, dtype=torch.qint8)
+
+def load_model(model_class, model_path, device, quantize=QUANTIZE_MODELS, **model_kwargs):
+    """
+    Load the TorchScript artifact for model_path when it exists and is not
+    older than the state dict, falling back to the eager model otherwise
+
+    Args:
+        model_class: nn.Module subclass to instantiate for the eager fallback
+        model_path: Path to the .pth state dict
+        device: torch.device to load onto
+        quantize: Return a dynamically int8-quantized eager model instead (CPU only)
+        **model_kwargs: Constructor arguments for model_class
+
+    Returns:
+        nn.Module or torch.jit.ScriptModule: The model in eval mode
+    """
+    if quantize:
+        if device.type == 'cpu':
+            model = quantize_dynamic(load_eager_model(model_class, model_path, device, **model_kwargs))
+            logger.info(f"Using int8 dynamically quantized {model_class.__name__}")
+            return model
+        logger.warning(f"Dynamic quantization is CPU only, loading fp32 {model_class.__name__} on {device}")
+    scripted_path = torchscript_path(model_path)
+    if TORCHSCRIPT_ENABLED and os.path.exists(scripted_path):
+        if os.path.exists(model_path) and os.path.getmtime(model_path) > os.path.getmtime(scripted_path):
+            logger.warning(f"{scripted_path} is older than {model_path}, re-run export_models.py; using eager model")
+        else:
+            try:
+                model = torch.jit.load(scripted_path, map_location=device)
+                model.eval()
+                logger.info(f"Loaded TorchScript {model_class.__name__} from {scripted_path}")
+                return model
+            except Exception as e:
+                logger.error(f"Error loading TorchScript artifact {scripted_path}: {str(e)}")
+    return load_eager_model(model_class, model_path, device, **model_kwargs)
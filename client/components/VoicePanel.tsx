@@ -300,7 +300,7 @@ export default function VoicePanel({ API_URL }: VoicePanelProps) {
         if (data.audio) {
           try {
             // Convert base64 to audio
-            const audioBlob = base64ToBlob(data.audio, "audio/mp3")
+            const audioBlob = base64ToBlob(data.audio, audioMimeType(data.format))
             const audioUrl = URL.createObjectURL(audioBlob)
             setResponseAudioUrl(audioUrl)
 
@@ -396,7 +396,7 @@ export default function VoicePanel({ API_URL }: VoicePanelProps) {
 
           if (ttsData.audio) {
             // Convert base64 to audio
-            const audioBlob = base64ToBlob(ttsData.audio, "audio/mp3")
+            const audioBlob = base64ToBlob(ttsData.audio, audioMimeType(ttsData.format))
             const audioUrl = URL.createObjectURL(audioBlob)
             setResponseAudioUrl(audioUrl)
 
@@ -419,6 +419,9 @@ export default function VoicePanel({ API_URL }: VoicePanelProps) {
     }
   }
 
+  // The backend replies with MP3 or WAV depending on its TTS engine
+  const audioMimeType = (format?: string) => (format === "wav" ? "audio/wav" : "audio/mpeg")
+
   const base64ToBlob = (base64: string, mimeType: string) => {
     const byteCharacters = atob(base64)
     const byteArrays = []